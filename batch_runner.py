@@ -0,0 +1,190 @@
+# batch_runner.py
+
+"""
+Headless, non-interactive runner for UAAL command scripts.
+
+Skips onboarding and executes one or more scripts of assisted-mode commands
+(click, type, press, navigate, switch, back, forward, refresh, ...) back to
+back. The UI is only re-perceived when a step needs a selector and an
+earlier action may have changed the page. Per-step and total wall times are
+logged and can be written to a JSONL report.
+
+Usage:
+    python batch_runner.py --config batch.json login.uaal search.uaal [--report times.jsonl]
+
+Config file (JSON):
+    {"target": {"type": "web", "identifier": "https://example.com"},
+     "headless": true, "context_window": 8192, "apply_limits": false,
+     "metrics": "uaal_metrics.jsonl"}
+"""
+
+import argparse
+import json
+import logging
+import time
+from uaal_engine.logger_setup import setup_logger
+from uaal_engine.command_resolver import SELECTOR_PATTERN
+from uaal_engine.compact_dom import selector_map
+from uaal_engine import registry, telemetry
+from main import _execute_assisted_command
+
+# Actions that leave the element list intact, so the current dom_map stays valid.
+NON_STRUCTURAL_ACTIONS = ['type']
+
+
+def load_script(path):
+    """Returns the non-empty, non-comment lines of a command script."""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith('#')]
+
+
+def create_driver(target, headless):
+    driver = registry.create_driver(target["type"], headless=headless)
+    with telemetry.span("connect", target=target["identifier"]):
+        driver.connect_to_app(target["identifier"])
+    return driver
+
+
+def needs_selector(parts):
+    """True when a command's meaning depends on the current dom_map."""
+    if not parts: return False
+    if parts[0] == 'click': return True
+    if parts[0] == 'type' and len(parts) > 1 and parts[1][0] in "\"'": return True
+    return parts[0] == 'type' and len(parts) > 2 and bool(SELECTOR_PATTERN.match(parts[1]))
+
+
+class BatchSession:
+    """Holds the driver and the last perceived dom_map across steps and workflows."""
+    def __init__(self, config):
+        self.config = config
+        self.target = config["target"]
+        self.headless = config.get("headless", True)
+        self.context_window = config.get("context_window", 8192)
+        self.apply_limits = config.get("apply_limits", False)
+        self.driver = None
+        self.dom_map = None
+
+    def start(self):
+        """Puts the session back on the configured target, reusing the driver when possible."""
+        target = self.config["target"]
+        if self.driver is not None and self.target["type"] != target["type"]:
+            self.close()
+        self.target = target
+        if self.driver is None:
+            self.driver = create_driver(self.target, self.headless)
+        else:
+            with telemetry.span("connect", target=self.target["identifier"]):
+                self.driver.connect_to_app(self.target["identifier"])
+        self.dom_map = None
+
+    def perceive(self):
+        if hasattr(self.driver, 'settle'):
+            self.driver.settle()
+        with telemetry.span("get_ui_dom"):
+            result = self.driver.get_ui_dom(context_window=self.context_window, apply_limits=self.apply_limits)
+        if result.get("captcha_detected"):
+            logging.warning("CAPTCHA detected; an unattended run cannot solve it.")
+        self.dom_map = selector_map(result["dom"])
+
+    def switch(self, target_type, identifier):
+        self.close()
+        self.target = {"type": target_type, "identifier": identifier}
+        self.driver = create_driver(self.target, self.headless)
+
+    def run_step(self, command_str):
+        """Executes one command. Returns (ok, perceived) where perceived says whether a rescan was needed."""
+        parts = command_str.split()
+        action = parts[0].lower() if parts else ''
+        if action == 'switch':
+            if len(parts) < 3:
+                logging.error("Invalid switch command. Usage: switch <type> <identifier>")
+                return False, False
+            self.switch(parts[1].lower(), " ".join(parts[2:]))
+            return True, False
+
+        perceived = False
+        if needs_selector([p.lower() for p in parts]) and self.dom_map is None:
+            self.perceive()
+            perceived = True
+
+        result = _execute_assisted_command(command_str, self.driver, self.dom_map or {}, self.driver.is_web)
+        if result.get('action_taken') and action not in NON_STRUCTURAL_ACTIONS:
+            # The page may have changed; the next selector lookup must rescan.
+            self.dom_map = None
+        return bool(result.get('action_taken')), perceived
+
+    def close(self):
+        if self.driver and hasattr(self.driver, 'cleanup'):
+            self.driver.cleanup()
+        self.driver = None
+        self.dom_map = None
+
+
+def run_workflow(session, script_path, keep_going=False, report=None):
+    logging.info(f"=== WORKFLOW: {script_path} ===")
+    steps = load_script(script_path)
+    workflow_start = time.perf_counter()
+    session.start()
+    failures = 0
+    for index, command_str in enumerate(steps, 1):
+        step_start = time.perf_counter()
+        try:
+            ok, perceived = session.run_step(command_str)
+        except Exception as e:
+            logging.error(f"Error executing command '{command_str}': {e}")
+            ok, perceived = False, False
+        elapsed = time.perf_counter() - step_start
+        logging.info(f"[{index}/{len(steps)}] {'OK  ' if ok else 'FAIL'} {elapsed * 1000:8.1f} ms"
+                     f"{' (rescanned)' if perceived else ''}  {command_str}")
+        if report:
+            report.write(json.dumps({"workflow": script_path, "step": index, "command": command_str,
+                                     "ok": ok, "rescanned": perceived, "seconds": round(elapsed, 4)}) + "\n")
+        if not ok:
+            failures += 1
+            if not keep_going:
+                logging.error("Stopping workflow after failed step.")
+                break
+    total = time.perf_counter() - workflow_start
+    logging.info(f"=== {script_path}: {len(steps)} steps, {failures} failed, {total:.2f}s total ===")
+    if report:
+        report.write(json.dumps({"workflow": script_path, "total_seconds": round(total, 4),
+                                 "failures": failures}) + "\n")
+    return failures == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run UAAL command scripts without onboarding.")
+    parser.add_argument("--config", required=True, help="JSON file with the target and driver settings.")
+    parser.add_argument("scripts", nargs="+", help="Command scripts, one command per line, run in order.")
+    parser.add_argument("--report", help="Append per-step timings to this JSONL file.")
+    parser.add_argument("--keep-going", action="store_true", help="Continue a workflow after a failed step.")
+    args = parser.parse_args()
+
+    setup_logger()
+    registry.load_plugins()
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if config.get("metrics"):
+        telemetry.enable(config["metrics"])
+    else:
+        telemetry.enable_from_env()
+
+    session = BatchSession(config)
+    report = open(args.report, 'a', encoding='utf-8') if args.report else None
+    run_start = time.perf_counter()
+    succeeded = 0
+    try:
+        for script_path in args.scripts:
+            if run_workflow(session, script_path, keep_going=args.keep_going, report=report):
+                succeeded += 1
+    finally:
+        session.close()
+        if report: report.close()
+    logging.info(f"BATCH: {succeeded}/{len(args.scripts)} workflows succeeded in "
+                 f"{time.perf_counter() - run_start:.2f}s.")
+    raise SystemExit(0 if succeeded == len(args.scripts) else 1)
+
+
+if __name__ == "__main__":
+    main()
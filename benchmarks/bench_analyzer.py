@@ -0,0 +1,236 @@
+# benchmarks/bench_analyzer.py
+"""
+Analyzer latency and token benchmark.
+
+Drives analyze_dom and interpret_command over saved DOMs and reports, per
+operation and concurrency level: wall time, throughput, latency percentiles,
+prompt/completion tokens per call and the parse success rate. An
+interpret_command answer only counts as parsed when it is a command the
+assisted loop would run as is (a known action and, where one is given, a
+selector from the DOM). The mock's echo mode cannot produce commands, so
+that rate is reported as n/a there; canned mode answers with a button of
+the benchmarked DOM.
+
+By default APIAnalyzer talks to an in-process MockLLMServer, so prompt
+changes can be compared for free; pass --endpoint to measure a real
+provider instead. --analyzer semantic runs a local model (sequentially:
+the transformers pipeline is not safe to share between threads).
+
+DOMs come from --dom files (JSON lists as logged by assisted mode) or, by
+default, from the pages in benchmarks/corpus/.
+
+Usage:
+    python benchmarks/bench_analyzer.py [--concurrency 1,2,4,8] [--runs 3]
+        [--latency 0.2] [--tps 50] [--mode echo|canned] [--malformed-rate 0.0]
+        [--endpoint URL --api-key KEY --model NAME] [--dom saved_dom.json ...] [--output report.json]
+    python benchmarks/bench_analyzer.py --analyzer semantic --model microsoft/Phi-3-mini-4k-instruct
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+from mock_llm_server import DEFAULT_CANNED, MockLLMServer
+from uaal_engine.command_resolver import CommandResolver
+
+CORPUS_DIR = os.path.join(BENCHMARK_DIR, "corpus")
+VALID_ACTIONS = ['click', 'type', 'press', 'navigate', 'back', 'forward', 'refresh', 'help', 'exit']
+SAMPLE_COMMANDS = [
+    "clik b1",
+    "type into the search box hello world",
+    "go back a page",
+    "press enter",
+    "open the first link",
+]
+
+
+def load_doms(paths):
+    doms = {}
+    if paths:
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                doms[os.path.basename(path)] = json.load(f)
+        return doms
+    from uaal_engine.browser_driver import BrowserDriver
+    driver = BrowserDriver(launch=False)
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html"))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            doms[os.path.basename(path)] = driver.parse_html(f.read())["dom"].to_list()
+    return doms
+
+
+def display_dom(dom):
+    return [{k: v for k, v in item.items() if k != 'internal_selector'} for item in dom]
+
+
+def valid_command(answer, selectors):
+    """True when an interpret_command answer is a well-formed command for the DOM."""
+    parts = (answer or "").strip().lower().split()
+    return CommandResolver(VALID_ACTIONS).is_well_formed(parts, selectors)
+
+
+def canned_rules(display):
+    """DEFAULT_CANNED, with the command interpretation naming a button that exists in display."""
+    button = next((item["short_selector"] for item in display if item.get("tag") == "button"), "b1")
+    return [dict(rule, response=f"click {button}") if rule["match"] == "corrects user input" else rule
+            for rule in DEFAULT_CANNED]
+
+
+def build_tasks(doms, runs, score_interpret=True):
+    """
+    Returns a list of (operation, label, call) where call(analyzer) -> parsed_ok,
+    or None for interpret_command when score_interpret is False.
+    """
+    tasks = []
+    display = display_dom(next(iter(doms.values()))) if doms else []
+    selectors = {item["short_selector"] for item in display}
+    for _ in range(runs):
+        for name, dom in doms.items():
+            tasks.append(("analyze_dom", name, lambda a, dom=dom: isinstance(a.analyze_dom(dom), list)))
+        for command in SAMPLE_COMMANDS:
+            tasks.append(("interpret_command", command, interpret_task(command, display, selectors, score_interpret)))
+    return tasks
+
+
+def interpret_task(command, display, selectors, score):
+    def call(analyzer):
+        answer = analyzer.interpret_command(command, VALID_ACTIONS, display)
+        return valid_command(answer, selectors) if score else None
+    return call
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def run_level(make_analyzer, tasks, concurrency):
+    """Runs every task with `concurrency` workers, each owning its own analyzer."""
+    local = threading.local()
+    results = []
+    lock = threading.Lock()
+
+    def worker(task):
+        if not hasattr(local, "analyzer"):
+            local.analyzer = make_analyzer()
+        operation, label, call = task
+        start = time.perf_counter()
+        try:
+            parsed = call(local.analyzer)
+        except Exception as e:
+            logging.error(f"{operation} '{label}' failed: {e}")
+            parsed = False
+        elapsed = time.perf_counter() - start
+        usage = getattr(local.analyzer, "last_usage", None) or {}
+        with lock:
+            results.append({
+                "operation": operation, "seconds": elapsed, "parsed": parsed,
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+            })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, tasks))
+    wall = time.perf_counter() - start
+
+    report = {"concurrency": concurrency, "calls": len(results), "wall_s": round(wall, 3),
+              "calls_per_s": round(len(results) / wall, 2) if wall else 0.0, "operations": {}}
+    for operation in sorted({r["operation"] for r in results}):
+        rows = [r for r in results if r["operation"] == operation]
+        seconds = [r["seconds"] for r in rows]
+        scored = [r["parsed"] for r in rows if r["parsed"] is not None]
+        report["operations"][operation] = {
+            "calls": len(rows),
+            "mean_s": round(statistics.mean(seconds), 3),
+            "p50_s": round(percentile(seconds, 50), 3),
+            "p95_s": round(percentile(seconds, 95), 3),
+            "prompt_tokens_per_call": round(statistics.mean(r["prompt_tokens"] for r in rows), 1),
+            "completion_tokens_per_call": round(statistics.mean(r["completion_tokens"] for r in rows), 1),
+            "parse_success_rate": round(sum(scored) / len(scored), 3) if scored else None,
+        }
+    return report
+
+
+def print_report(reports):
+    print(f"{'conc':>4} {'operation':<18}{'calls':>6}{'mean s':>9}{'p50 s':>9}{'p95 s':>9}"
+          f"{'prompt tok':>12}{'compl tok':>11}{'parse ok':>10}")
+    for report in reports:
+        for operation, s in report["operations"].items():
+            print(f"{report['concurrency']:>4} {operation:<18}{s['calls']:>6}{s['mean_s']:>9.3f}{s['p50_s']:>9.3f}"
+                  f"{s['p95_s']:>9.3f}{s['prompt_tokens_per_call']:>12.1f}{s['completion_tokens_per_call']:>11.1f}"
+                  + (f"{s['parse_success_rate']:>10.0%}" if s['parse_success_rate'] is not None else f"{'n/a':>10}"))
+        print(f"     total: {report['calls']} calls in {report['wall_s']}s ({report['calls_per_s']} calls/s)")
+    base = reports[0]["calls_per_s"] if reports else 0
+    if base:
+        scaling = ", ".join(f"{r['concurrency']}x: {r['calls_per_s'] / base:.2f}" for r in reports)
+        print(f"Throughput scaling vs. concurrency {reports[0]['concurrency']}: {scaling}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyzer latency, token and parse-rate benchmark.")
+    parser.add_argument("--analyzer", choices=["api", "semantic"], default="api")
+    parser.add_argument("--endpoint", help="Real chat completions URL. Omit to use the built-in mock server.")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", "mock-key"))
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--dom", nargs="*", help="JSON files holding perceived DOM lists.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated worker counts.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock server: fixed seconds per response.")
+    parser.add_argument("--tps", type=float, default=50.0, help="Mock server: completion tokens per second.")
+    parser.add_argument("--mode", choices=["echo", "canned"], default="echo", help="Mock server response mode.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Mock server: fraction of truncated replies.")
+    parser.add_argument("--output", help="Also write the report as JSON to this path.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+
+    doms = load_doms(args.dom)
+    # Echoed prompts are never commands; only a real model or canned answers can be scored.
+    echo = args.analyzer == "api" and not args.endpoint and args.mode == "echo"
+    tasks = build_tasks(doms, args.runs, score_interpret=not echo)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    server = None
+    if args.analyzer == "semantic":
+        from uaal_engine.semantic_analyzer import SemanticAnalyzer
+        analyzer = SemanticAnalyzer(model_name=args.model or "microsoft/Phi-3-mini-4k-instruct")
+        make_analyzer = lambda: analyzer
+        if levels != [1]:
+            print("Local models run one call at a time; ignoring --concurrency.")
+            levels = [1]
+    else:
+        from uaal_engine.api_analyzer import APIAnalyzer
+        endpoint = args.endpoint
+        if not endpoint:
+            display = display_dom(next(iter(doms.values()))) if doms else []
+            server = MockLLMServer(latency=args.latency, tokens_per_second=args.tps, mode=args.mode,
+                                   canned=canned_rules(display), malformed_rate=args.malformed_rate).start()
+            endpoint = server.url
+        model = args.model or "gpt-4-turbo"
+        make_analyzer = lambda: APIAnalyzer(args.api_key, endpoint_url=endpoint, model=model)
+
+    try:
+        reports = [run_level(make_analyzer, tasks, level) for level in levels]
+    finally:
+        if server:
+            server.stop()
+
+    print_report(reports)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+        print(f"Report written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_bulk.py
+"""
+Bulk perception scaling benchmark.
+
+Writes a fixture site (the saved corpus pages plus generated catalogue pages)
+to a temporary directory, serves it with `python -m http.server` on
+127.0.0.1 in its own process, and runs bulk_perceive.run_bulk over every
+page with each worker count. Reports pages/s, failures, the speedup over one
+worker and the parallel efficiency (speedup / workers). Times include
+starting each pool's browsers, so use enough pages to amortize that.
+
+Usage:
+    python benchmarks/bench_bulk.py [--workers 1,2,4,8] [--pages 200] [--items 300] [--output bulk.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_perception import CORPUS_DIR, synthetic_list
+from bulk_perceive import run_bulk
+
+
+def default_worker_counts():
+    counts, n = [], 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def write_site(directory, pages, items):
+    """Writes the fixture pages; returns their paths relative to the site root."""
+    names = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html"))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as source, \
+                open(os.path.join(directory, os.path.basename(path)), 'w', encoding='utf-8') as target:
+            target.write(source.read())
+        names.append(os.path.basename(path))
+    for index in range(max(0, pages - len(names))):
+        name = f"catalogue_{index}.html"
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(synthetic_list(items + index % 50))
+        names.append(name)
+    return names[:pages]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(directory):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "http.server", str(port), "--bind", "127.0.0.1", "--directory", directory],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}/"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(base_url, timeout=1).close()
+            return server, base_url
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError("Fixture server did not start.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of bulk_perceive per worker count.")
+    parser.add_argument("--workers", default=",".join(map(str, default_worker_counts())),
+                        help="Comma-separated worker counts (default: powers of two up to the CPU count).")
+    parser.add_argument("--pages", type=int, default=200, help="Pages perceived per worker count.")
+    parser.add_argument("--items", type=int, default=300, help="List items on each generated page.")
+    parser.add_argument("--output", help="Write the results as JSON to this path.")
+    args = parser.parse_args()
+    worker_counts = [int(n) for n in args.workers.split(",") if n.strip()]
+
+    results = []
+    with tempfile.TemporaryDirectory() as site:
+        names = write_site(site, args.pages, args.items)
+        server, base_url = start_server(site)
+        try:
+            print(f"{'workers':>8}{'pages/s':>10}{'seconds':>10}{'failures':>10}{'speedup':>9}{'efficiency':>12}")
+            for workers in worker_counts:
+                with open(os.devnull, 'w') as output:
+                    summary = run_bulk((base_url + name for name in names), output, workers=workers)
+                result = {"workers": workers, "pages_per_second": summary["pages_per_second"],
+                          "seconds": summary["seconds"], "failures": summary["failures"]}
+                base = results[0]["pages_per_second"] if results else summary["pages_per_second"]
+                result["speedup"] = round(summary["pages_per_second"] / base, 2) if base else None
+                result["efficiency"] = round(result["speedup"] / (workers / worker_counts[0]), 2) if base else None
+                results.append(result)
+                print(f"{workers:>8}{result['pages_per_second']:>10.2f}{result['seconds']:>10.2f}"
+                      f"{result['failures']:>10}{result['speedup']:>8.2f}x{result['efficiency']:>12.0%}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
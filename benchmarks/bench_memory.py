@@ -0,0 +1,95 @@
+# benchmarks/bench_memory.py
+"""
+Raw-mode perception memory benchmark.
+
+Replays what one raw assisted-mode turn keeps and builds for a large page:
+parse_html without limits (the driver's DOM cache entry), the dom_map,
+the command resolver's index, the rendered lines and the DOM dump that the
+perception pipeline logs. Reports the peak traced memory during the turn,
+the memory still held once the turn's temporaries are gone, and the
+wall-clock time of an untraced turn.
+
+Usage:
+    python benchmarks/bench_memory.py [--elements 10000] [--runs 3] [--output memory.json]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_perception import synthetic_table
+from main import ASSISTED_ACTIONS
+from uaal_engine import compact_dom
+from uaal_engine.browser_driver import BrowserDriver
+from uaal_engine.command_resolver import CommandResolver
+from uaal_engine.perception_pipeline import PerceptionPipeline
+from uaal_engine.renderer import DualTerminalRenderer
+
+
+def raw_turn(html):
+    """One perception turn in raw mode; returns what run_assisted_mode keeps until the next one."""
+    driver = BrowserDriver(launch=False)
+    renderer = DualTerminalRenderer(launch_window=False)
+    resolver = CommandResolver(ASSISTED_ACTIONS)
+    pipeline = PerceptionPipeline(renderer, None, "raw")
+    try:
+        ui_dom = driver.parse_html(html, apply_limits=False)["dom"]
+        driver.dom_cache["page"] = ui_dom
+        dom_map = compact_dom.selector_map(ui_dom)
+        resolver.index(ui_dom)
+        pipeline.current_dom = ui_dom
+        pipeline._process(ui_dom, pipeline.generation)
+    finally:
+        pipeline.close()
+    return driver, dom_map, resolver, renderer, pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak and retained memory of a raw-mode perception turn.")
+    parser.add_argument("--elements", type=int, default=10000, help="Approximate number of page elements.")
+    parser.add_argument("--runs", type=int, default=3, help="Untraced runs for the timing.")
+    parser.add_argument("--output", help="Write the result as JSON to this path.")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    # Each synthetic table row holds three elements (span, link and input).
+    html = synthetic_table(max(1, args.elements // 3))
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        raw_turn(html)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    kept = raw_turn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "elements": len(kept[1]),
+        "seconds": round(statistics.median(timings), 4),
+        "peak_mb": round(peak / 1e6, 2),
+        "retained_mb": round(retained / 1e6, 2),
+    }
+    print(f"{result['elements']} elements: {result['seconds']:.3f}s per turn, "
+          f"peak {result['peak_mb']:.2f} MB, retained {result['retained_mb']:.2f} MB")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Result written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# benchmarks/bench_perception.py
+"""
+Offline perception benchmark.
+
+Runs BrowserDriver's DOM extraction and DualTerminalRenderer._render_to_text
+over every saved page in benchmarks/corpus/ plus generated synthetic pages
+(deep nesting, a 10k-row table, a huge list). Two paths are measured:
+
+  parse   - BrowserDriver.parse_html on the raw HTML, no browser involved.
+  browser - headless Chromium loading the page from a file:// URL, then get_ui_dom.
+
+Reports elements/s, peak Python memory and output sizes. When the baseline
+file exists, the run fails (exit code 1) if any case is slower than the stored
+median by more than --threshold. No baseline is shipped, since timings only
+compare on the machine that took them: run once with --save-baseline to create
+one. Without it, the regression check is skipped and the run exits 0.
+
+Usage:
+    python benchmarks/bench_perception.py [--paths parse,browser] [--runs 3]
+        [--scale 1.0] [--baseline benchmarks/perception_baseline.json] [--save-baseline] [--threshold 0.25]
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+from uaal_engine.browser_driver import BrowserDriver
+from uaal_engine.renderer import DualTerminalRenderer
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perception_baseline.json")
+
+
+def synthetic_deep_nesting(depth=600):
+    inner = '<span>Deeply nested text</span><a href="#deep">Deep link</a><button>Deep button</button>'
+    return f"<html><body><main>{'<div>' * depth}{inner}{'</div>' * depth}</main></body></html>"
+
+
+def synthetic_table(rows=10000):
+    body = "".join(
+        f'<tr><td><span>Row {i}</span></td><td><a href="/item/{i}">Open item {i}</a></td>'
+        f'<td><input placeholder="Qty {i}"></td></tr>'
+        for i in range(rows)
+    )
+    return f"<html><body><main><h1>Inventory</h1><table>{body}</table></main></body></html>"
+
+
+def synthetic_list(items=20000):
+    body = "".join(f'<li><a href="/p/{i}">Product {i}</a> <span>${i}.99</span></li>' for i in range(items))
+    return f"<html><body><main><h2>Catalogue</h2><ul>{body}</ul></main></body></html>"
+
+
+SYNTHETIC_CASES = {
+    "synthetic_deep_nesting": (synthetic_deep_nesting, 600),
+    "synthetic_table_10k": (synthetic_table, 10000),
+    "synthetic_list_20k": (synthetic_list, 20000),
+}
+
+
+def load_cases(scale=1.0):
+    cases = {}
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html"))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            cases[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    for name, (generator, size) in SYNTHETIC_CASES.items():
+        cases[name] = generator(max(1, int(size * scale)))
+    return cases
+
+
+def measure(extract, runs):
+    """Returns (median seconds, dom) for extract() over runs, plus peak memory from one traced run."""
+    timings, dom = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        dom = extract()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    extract()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), dom, peak
+
+
+def bench_case(name, html, path, runs, renderer, browser_driver, temp_dir):
+    if path == "parse":
+        driver = BrowserDriver(launch=False)
+        extract = lambda: driver.parse_html(html, apply_limits=False)["dom"]
+    else:
+        file_path = os.path.join(temp_dir, f"{name}.html")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        browser_driver.navigate(f"file://{file_path}")
+
+        def extract():
+            browser_driver.dom_cache.clear()
+            return browser_driver.get_ui_dom(apply_limits=False)["dom"]
+
+    seconds, dom, peak = measure(extract, runs)
+    render_start = time.perf_counter()
+    rendered = renderer._render_to_text(dom)
+    render_seconds = time.perf_counter() - render_start
+    return {
+        "case": name, "path": path, "html_bytes": len(html), "elements": len(dom),
+        "seconds": round(seconds, 4),
+        "elements_per_second": round(len(dom) / seconds, 1) if seconds else None,
+        "peak_memory_mb": round(peak / 1e6, 2),
+        "dom_json_bytes": len(json.dumps(dom.to_list())),
+        "render_seconds": round(render_seconds, 4),
+        "render_bytes": len(rendered),
+    }
+
+
+def compare_to_baseline(results, baseline, threshold):
+    regressions = []
+    for result in results:
+        for metric in ("seconds", "render_seconds"):
+            key = f"{result['case']}:{result['path']}:{metric}"
+            previous = baseline.get(key)
+            if previous and result[metric] > previous * (1 + threshold):
+                regressions.append(f"{key}: {result[metric]:.4f}s vs baseline {previous:.4f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline perception benchmark over saved and synthetic pages.")
+    parser.add_argument("--paths", default="parse,browser", help="Comma-separated: parse, browser.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--cases", help="Comma-separated case names to run (default: all).")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Size factor for the synthetic pages; only compare baselines taken at the same scale.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Timings to compare against; the check is skipped when the file does not exist.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run's timings as the baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs. baseline (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    cases = load_cases(args.scale)
+    if args.cases:
+        cases = {name: html for name, html in cases.items() if name in args.cases.split(",")}
+    paths = args.paths.split(",")
+    renderer = DualTerminalRenderer(launch_window=False)
+    browser_driver = BrowserDriver(headless=True) if "browser" in paths else None
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name, html in cases.items():
+                for path in paths:
+                    result = bench_case(name, html, path, args.runs, renderer, browser_driver, temp_dir)
+                    results.append(result)
+                    print(f"{name:<28}{path:<9}{result['elements']:>8} el {result['seconds']:>9.4f}s "
+                          f"{result['elements_per_second'] or 0:>11.0f} el/s {result['peak_memory_mb']:>8.2f} MB "
+                          f"render {result['render_seconds']:.4f}s/{result['render_bytes']} B")
+    finally:
+        if browser_driver: browser_driver.cleanup()
+
+    if args.save_baseline:
+        baseline = {}
+        for result in results:
+            for metric in ("seconds", "render_seconds"):
+                baseline[f"{result['case']}:{result['path']}:{metric}"] = result[metric]
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}.")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; skipping the regression check. "
+              f"Run with --save-baseline on this machine to create one.")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = compare_to_baseline(results, json.load(f), args.threshold)
+    if regressions:
+        print("PERFORMANCE REGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print(f"No case slower than the baseline by more than {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start import benchmark.
+
+For each configuration (target type x model source), starts a fresh
+interpreter, imports main.py and then the driver and analyzer backends that
+onboarding would select, without launching a browser or loading a model.
+The 'eager' row imports every built-in backend, which is what main.py used
+to do at module load. A backend whose dependency is missing (pywinauto off
+Windows, torch on a slim install) is reported as unavailable.
+
+Reports the median over --runs, the number of loaded modules and whether
+torch was imported. With --importtime, the slowest imports of each
+configuration (from python -X importtime) are listed too.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--configs web+api,desktop+local] [--importtime] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGS = {
+    "web+api": ("web", "api"),
+    "web+local": ("web", "local"),
+    "web+raw": ("web", None),
+    "desktop+api": ("desktop", "api"),
+    "desktop+local": ("desktop", "local"),
+    "eager": (None, None),
+}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+from uaal_engine import registry
+main_seconds = time.perf_counter() - start
+driver, analyzer, error = {driver!r}, {analyzer!r}, None
+try:
+    if driver is None and analyzer is None:
+        for name in registry.driver_types(): registry.load_driver(name)
+        for name in registry.analyzer_sources(): registry.load_analyzer(name)
+    else:
+        registry.load_driver(driver)
+        if analyzer: registry.load_analyzer(analyzer)
+except ImportError as e:
+    error = str(e)
+print(json.dumps({{"main": main_seconds, "total": time.perf_counter() - start, "modules": len(sys.modules),
+                  "torch": "torch" in sys.modules, "error": error}}))
+"""
+
+
+def probe(driver, analyzer, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + \
+              ["-c", PROBE.format(driver=driver, analyzer=analyzer)]
+    completed = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1]}, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_imports(importtime_output, count=8):
+    """Parses 'import time: self | cumulative | name' lines; returns the top-level imports by cumulative time."""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def bench_config(name, runs, importtime):
+    driver, analyzer = CONFIGS[name]
+    samples = []
+    for _ in range(runs):
+        sample, _ = probe(driver, analyzer)
+        if sample.get("error"):
+            return {"config": name, "error": sample["error"]}
+        samples.append(sample)
+    result = {
+        "config": name,
+        "main_seconds": round(statistics.median(s["main"] for s in samples), 4),
+        "total_seconds": round(statistics.median(s["total"] for s in samples), 4),
+        "modules": samples[-1]["modules"],
+        "torch_loaded": samples[-1]["torch"],
+    }
+    if importtime:
+        _, output = probe(driver, analyzer, importtime=True)
+        result["slowest_imports"] = [{"module": m, "ms": round(us / 1000, 1)} for us, m in slowest_imports(output)]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time per configuration.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per configuration.")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help=f"Comma-separated subset of: {', '.join(CONFIGS)}.")
+    parser.add_argument("--importtime", action="store_true", help="List the slowest imports of each configuration.")
+    parser.add_argument("--output", help="Write the results as JSON to this path.")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.configs.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CONFIGS]
+    if unknown:
+        parser.error(f"Unknown configuration(s): {', '.join(unknown)}")
+
+    results = []
+    print(f"{'config':<16}{'main.py':>10}{'total':>10}{'modules':>9}  torch")
+    for name in names:
+        result = bench_config(name, args.runs, args.importtime)
+        results.append(result)
+        if result.get("error"):
+            print(f"{name:<16}unavailable: {result['error']}")
+            continue
+        print(f"{name:<16}{result['main_seconds']:>9.3f}s{result['total_seconds']:>9.3f}s{result['modules']:>9}  "
+              f"{'yes' if result['torch_loaded'] else 'no'}")
+        for row in result.get("slowest_imports", []):
+            print(f"{'':<18}{row['ms']:>9.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# benchmarks/mock_llm_server.py
+"""
+Local stand-in for an OpenAI-compatible chat completions endpoint.
+
+Answers POST /v1/chat/completions with a simulated delay of
+latency + completion_tokens / tokens_per_second and an approximate 'usage'
+block, so APIAnalyzer can be benchmarked without spending API credit.
+
+Response modes:
+  echo   - returns the last user message unchanged (the DOM JSON for analyze_dom).
+  canned - returns the first canned response whose 'match' substring occurs in
+           the prompt. Rules come from --canned (a JSON list of
+           {"match": ..., "response": ...}) or DEFAULT_CANNED.
+
+Usage:
+    python benchmarks/mock_llm_server.py [--port 8001] [--latency 0.3] [--tps 40]
+        [--mode echo|canned] [--canned rules.json] [--malformed-rate 0.0]
+
+Then point APIAnalyzer at http://127.0.0.1:8001/v1/chat/completions with any API key.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CANNED = [
+    {"match": "UI analysis machine", "response": json.dumps([
+        {"short_selector": "b1", "predicted_action": "CLICK BUTTON", "summary": "Primary button"},
+        {"short_selector": "i1", "predicted_action": "ENTER TEXT", "summary": "Text field"},
+    ])},
+    {"match": "UI automation planner", "response": json.dumps([{"command": "click", "short_selector": "b1"}])},
+    {"match": "corrects user input", "response": "click b1"},
+]
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Rough token count (words and punctuation marks); close enough to compare prompt strategies."""
+    return len(TOKEN_PATTERN.findall(text or ""))
+
+
+class MockLLMServer:
+    """Threaded mock endpoint. Use start()/stop() in-process or run this file as a script."""
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, tokens_per_second=50.0,
+                 mode="echo", canned=None, malformed_rate=0.0, seed=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.mode = mode
+        self.canned = canned or DEFAULT_CANNED
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests_served = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def respond(self, messages):
+        """Returns (content, usage) for a list of chat messages."""
+        prompt = "\n".join(message.get("content") or "" for message in messages)
+        if self.mode == "echo":
+            user_messages = [m.get("content") or "" for m in messages if m.get("role") == "user"]
+            content = user_messages[-1] if user_messages else ""
+        else:
+            content = next((rule["response"] for rule in self.canned if rule["match"] in prompt), "unknown")
+
+        with self.lock:
+            self.requests_served += 1
+            malformed = self.malformed_rate and self.random.random() < self.malformed_rate
+        if malformed:
+            # Cut the reply short, as a provider hitting max_tokens would.
+            content = content[:len(content) // 2]
+
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return content, usage
+
+    def delay_for(self, usage):
+        generation = usage["completion_tokens"] / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return self.latency + generation
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    messages = body["messages"]
+                except (ValueError, KeyError) as e:
+                    return self._send(400, {"error": {"message": f"Bad request: {e}"}})
+
+                content, usage = server.respond(messages)
+                time.sleep(server.delay_for(usage))
+                self._send(200, {
+                    "id": f"mock-{server.requests_served}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                })
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fixed seconds added to every response.")
+    parser.add_argument("--tps", type=float, default=50.0, help="Simulated completion tokens per second.")
+    parser.add_argument("--mode", choices=["echo", "canned"], default="echo")
+    parser.add_argument("--canned", help="JSON file with a list of {\"match\": ..., \"response\": ...} rules.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of replies to truncate.")
+    args = parser.parse_args()
+
+    canned = None
+    if args.canned:
+        with open(args.canned, 'r', encoding='utf-8') as f:
+            canned = json.load(f)
+    server = MockLLMServer(args.host, args.port, args.latency, args.tps, args.mode, canned, args.malformed_rate)
+    print(f"Mock LLM server listening on {server.url} (mode={args.mode})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
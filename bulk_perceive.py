@@ -0,0 +1,201 @@
+# bulk_perceive.py
+
+"""
+Bulk perception: text DOMs for many pages, in parallel.
+
+Spreads a list of URLs or local HTML files over a pool of worker processes,
+each driving its own headless browser. At most --workers pages load at once
+and at most --queue more are submitted ahead, so long lists are read lazily.
+Each page's DOM is appended to the JSONL output as soon as it completes (in
+completion order, with the source, worker pid and timing). A failed page is
+written with its error, and the worker moves on. A final summary line holds
+per-worker throughput and failure counts.
+
+Usage:
+    python bulk_perceive.py --output doms.jsonl https://example.com pages/*.html
+    python bulk_perceive.py --output doms.jsonl --input urls.txt [--workers 8] [--limits] [--timeout 30]
+
+Input files list one URL or path per line ('#' for comments, '-' reads stdin).
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, util
+from pathlib import Path
+from uaal_engine.logger_setup import setup_logger
+from uaal_engine import compact_dom, registry
+
+DEFAULT_TIMEOUT = 30
+STAT_FIELDS = ("source", "worker", "seconds", "elements", "error")
+
+_driver = None
+_options = {}
+
+
+def to_url(source):
+    """URLs pass through; anything else is treated as a local file."""
+    if "://" in source or source.startswith(("about:", "data:")):
+        return source
+    return Path(source).resolve().as_uri()
+
+
+def read_sources(paths):
+    """Yields the entries of list files ('-' for stdin), skipping blanks and comments."""
+    for path in paths:
+        f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+        try:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+        finally:
+            if f is not sys.stdin: f.close()
+
+
+def _start_driver():
+    global _driver
+    _driver = registry.create_driver("web", headless=True)
+    _driver.page.set_default_timeout(_options["timeout"] * 1000)
+
+
+def _stop_driver():
+    global _driver
+    if _driver is not None:
+        try:
+            _driver.cleanup()
+        except Exception as e:
+            logging.warning(f"Browser cleanup failed: {e}")
+        _driver = None
+
+
+def _init_worker(options):
+    _options.update(options)
+    logging.basicConfig(level=logging.WARNING, format=f"%(asctime)s - worker {os.getpid()} - %(levelname)s - %(message)s")
+    registry.load_plugins()
+    # Pool workers exit without running atexit handlers; a finalizer still closes the browser.
+    util.Finalize(None, _stop_driver, exitpriority=10)
+    _start_driver()
+
+
+def perceive_page(source):
+    """Runs in a worker: loads one page. Returns its JSONL line and the fields the stats need."""
+    start = time.perf_counter()
+    record = {"source": source, "worker": os.getpid()}
+    try:
+        _driver.navigate(to_url(source))
+        result = _driver.get_ui_dom(context_window=_options["context_window"], apply_limits=_options["apply_limits"])
+        record.update(url=_driver.page.url, elements=len(result["dom"]),
+                      captcha_detected=result.get("captcha_detected", False), dom=compact_dom.to_list(result["dom"]))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        if _driver.page.is_closed():
+            logging.warning("Browser page was lost; starting a new browser.")
+            _stop_driver()
+            _start_driver()
+    record["seconds"] = round(time.perf_counter() - start, 4)
+    # Serialized here, so the parent only writes lines and does not limit how far the pool scales.
+    return json.dumps(record, separators=(",", ":")), {field: record.get(field) for field in STAT_FIELDS}
+
+
+class BulkStats:
+    """Per-worker page, failure and busy-time counts."""
+    def __init__(self):
+        self.workers = {}
+        self.start = time.perf_counter()
+
+    def add(self, record):
+        worker = self.workers.setdefault(record["worker"], {"pages": 0, "failures": 0, "busy_seconds": 0.0, "elements": 0})
+        worker["pages"] += 1
+        worker["failures"] += 1 if record.get("error") else 0
+        worker["busy_seconds"] += record["seconds"]
+        worker["elements"] += record.get("elements") or 0
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        workers = [
+            dict(stats, worker=pid, busy_seconds=round(stats["busy_seconds"], 3),
+                 pages_per_second=round(stats["pages"] / stats["busy_seconds"], 2) if stats["busy_seconds"] else None)
+            for pid, stats in sorted(self.workers.items())
+        ]
+        pages = sum(w["pages"] for w in workers)
+        return {
+            "pages": pages, "failures": sum(w["failures"] for w in workers), "seconds": round(elapsed, 3),
+            "pages_per_second": round(pages / elapsed, 2) if elapsed else None, "workers": workers,
+        }
+
+
+def run_bulk(sources, output, workers=None, queue=None, apply_limits=False, context_window=4096,
+             timeout=DEFAULT_TIMEOUT):
+    """Perceives every source on a process pool, writing records to output as they complete. Returns the summary."""
+    workers = workers or os.cpu_count() or 1
+    queue = workers if queue is None else queue
+    options = {"apply_limits": apply_limits, "context_window": context_window, "timeout": timeout}
+    stats = BulkStats()
+    pending = set()
+
+    def collect(done):
+        for future in done:
+            line, record = future.result()
+            stats.add(record)
+            output.write(line + "\n")
+            if record.get("error"):
+                logging.warning(f"FAIL {record['source']}: {record['error']}")
+        output.flush()
+
+    # Spawned workers start clean on every platform; Playwright must not inherit a forked event loop.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(options,)) as executor:
+        for source in sources:
+            if len(pending) >= workers + queue:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(perceive_page, source))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    summary = stats.summary()
+    output.write(json.dumps({"summary": summary}) + "\n")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perceive many pages in parallel headless browsers.")
+    parser.add_argument("sources", nargs="*", help="URLs or local HTML files.")
+    parser.add_argument("--input", action="append", default=[], help="File listing URLs or paths, one per line ('-' for stdin).")
+    parser.add_argument("--output", required=True, help="JSONL file for the results (appended).")
+    parser.add_argument("--workers", type=int, help="Browser processes (default: CPU count).")
+    parser.add_argument("--queue", type=int, help="Pages submitted ahead of the running ones (default: --workers).")
+    parser.add_argument("--limits", action="store_true", help="Apply the context-window element limit, as analyzed mode does.")
+    parser.add_argument("--context-window", type=int, default=4096)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-page load timeout in seconds.")
+    args = parser.parse_args()
+    if not args.sources and not args.input:
+        parser.error("Give at least one URL or file, or --input.")
+
+    setup_logger()
+    sources = itertools.chain(args.sources, read_sources(args.input))
+    try:
+        with open(args.output, 'a', encoding='utf-8') as output:
+            summary = run_bulk(sources, output, workers=args.workers, queue=args.queue, apply_limits=args.limits,
+                               context_window=args.context_window, timeout=args.timeout)
+    except BrokenProcessPool as e:
+        logging.error(f"A browser worker could not start or died: {e}")
+        raise SystemExit(1)
+    logging.info(f"BULK: {summary['pages']} pages, {summary['failures']} failed, {summary['seconds']:.2f}s "
+                 f"({summary['pages_per_second']} pages/s).")
+    for worker in summary["workers"]:
+        logging.info(f"  worker {worker['worker']}: {worker['pages']} pages, {worker['failures']} failed, "
+                     f"{worker['pages_per_second']} pages/s busy")
+    raise SystemExit(0 if summary["failures"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
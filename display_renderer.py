@@ -1,43 +1,211 @@
-# display_renderer.py
-
-import time
-import os
-import platform
-
-OUTPUT_FILE = 'renderer_output.txt'
-CLEAR_COMMAND = 'cls' if platform.system().lower() == "windows" else 'clear'
-
-def main():
-    print("--- UAAL Renderer Initialized ---")
-    print(f"Watching for updates in '{OUTPUT_FILE}'...")
-    time.sleep(2)
-
-    last_mod_time = 0
-    
-    while True:
-        try:
-            if os.path.exists(OUTPUT_FILE):
-                current_mod_time = os.path.getmtime(OUTPUT_FILE)
-                
-                if current_mod_time > last_mod_time:
-                    os.system(CLEAR_COMMAND)
-                    with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    print(content)
-                    last_mod_time = current_mod_time
-            else:
-                if last_mod_time != -1:
-                    os.system(CLEAR_COMMAND)
-                    print("\n--- Waiting for UI data from the main application... ---")
-                    last_mod_time = -1
-
-            time.sleep(0.5)
-
-        except KeyboardInterrupt:
-            break
-        except Exception as e:
-            print(f"An error occurred in the display renderer: {e}")
-            time.sleep(2)
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+# display_renderer.py
+
+import argparse
+import json
+import os
+import platform
+import queue
+import shutil
+import sys
+import textwrap
+import threading
+import time
+from multiprocessing.connection import Client
+
+# ANSI control sequences. Rows are rewritten in place, so a redraw neither
+# flickers like a full clear nor spawns a shell.
+CLEAR_LINE, CLEAR_SCREEN = "\x1b[K", "\x1b[2J"
+HIDE_CURSOR, SHOW_CURSOR = "\x1b[?25l", "\x1b[?25h"
+REVERSE, RESET = "\x1b[7m", "\x1b[0m"
+CONNECT_ATTEMPTS = 50
+# Set by the engine (uaal_engine/renderer.py) when it launches this window.
+AUTHKEY_ENV = "UAAL_RENDERER_AUTHKEY"
+IS_WINDOWS = platform.system().lower() == "windows"
+
+# Key sequences (Unix escape codes and Windows getwch pairs) mapped to scroll actions.
+KEYS = {
+    "j": "down", "\x1b[B": "down", "\xe0P": "down",
+    "k": "up", "\x1b[A": "up", "\xe0H": "up",
+    " ": "page_down", "\x1b[6~": "page_down", "\xe0Q": "page_down",
+    "b": "page_up", "\x1b[5~": "page_up", "\xe0I": "page_up",
+    "g": "home", "\x1b[H": "home", "\xe0G": "home",
+    "G": "end", "\x1b[F": "end", "\xe0O": "end",
+}
+
+
+def enable_ansi():
+    """Windows consoles need virtual terminal processing switched on for ANSI sequences."""
+    if not IS_WINDOWS:
+        return
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.GetStdHandle(-11)
+    mode = ctypes.c_uint32()
+    if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+        kernel32.SetConsoleMode(handle, mode.value | 0x0004)
+
+
+class Viewport:
+    """
+    Holds the rendered lines and draws only the slice that fits the terminal.
+    Rows are compared with what is already on screen, so a redraw writes
+    only the rows that changed.
+    """
+    def __init__(self):
+        self.lines = []
+        self.top = 0
+        self.screen = []
+        self.size = None
+
+    def apply(self, message):
+        if message.get("type") == "frame":
+            self.lines = list(message.get("lines", []))
+        elif message.get("type") == "patch":
+            start = message["start"]
+            self.lines[start:start + message["delete"]] = message["insert"]
+        self.top = min(self.top, self._max_top())
+
+    def _page_height(self):
+        return max(1, shutil.get_terminal_size().lines - 1)
+
+    def _max_top(self):
+        return max(0, len(self.lines) - self._page_height())
+
+    def scroll(self, action):
+        page = self._page_height()
+        moves = {"down": 1, "up": -1, "page_down": page, "page_up": -page,
+                 "home": -len(self.lines), "end": len(self.lines)}
+        self.top = max(0, min(self.top + moves[action], self._max_top()))
+
+    def _visible_rows(self, width, height):
+        rows, index = [], self.top
+        while len(rows) < height and index < len(self.lines):
+            line = self.lines[index]
+            rows.extend(textwrap.wrap(line, width, drop_whitespace=False) or [""])
+            index += 1
+        return rows[:height] + [""] * (height - len(rows)), index
+
+    def draw(self):
+        size = shutil.get_terminal_size()
+        if size != self.size:
+            # A resize invalidates everything on screen.
+            self.size, self.screen = size, []
+            sys.stdout.write(CLEAR_SCREEN)
+        # One column is kept free so a full-width row never triggers the terminal's own wrap.
+        width, height = max(1, size.columns - 1), max(1, size.lines - 1)
+        rows, last = self._visible_rows(width, height)
+        status = f" lines {self.top + 1}-{last} of {len(self.lines)}   j/k, PgUp/PgDn, g/G to scroll "
+        rows.append(REVERSE + status[:width] + RESET)
+
+        out = []
+        for number, row in enumerate(rows):
+            if number >= len(self.screen) or self.screen[number] != row:
+                out.append(f"\x1b[{number + 1};1H{row}{CLEAR_LINE}")
+        self.screen = rows
+        if out:
+            sys.stdout.write("".join(out))
+            sys.stdout.flush()
+
+
+def read_keys(keys):
+    """Feeds scroll actions from the keyboard into a queue (runs on a daemon thread)."""
+    if IS_WINDOWS:
+        import msvcrt
+        while True:
+            key = msvcrt.getwch()
+            if key in ("\x00", "\xe0"):
+                key = "\xe0" + msvcrt.getwch()
+            if key in KEYS:
+                keys.put(KEYS[key])
+    else:
+        if not sys.stdin.isatty():
+            return
+        fd = sys.stdin.fileno()
+        while True:
+            data = os.read(fd, 8).decode("utf-8", errors="ignore")
+            if not data:
+                return
+            action = KEYS.get(data) or KEYS.get(data[:1])
+            if action:
+                keys.put(action)
+
+
+def connect(address, authkey):
+    for _ in range(CONNECT_ATTEMPTS):
+        try:
+            return Client(address, authkey=authkey)
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.1)
+    raise ConnectionError(f"Could not reach the UAAL engine at {address}.")
+
+
+def run(connection, viewport):
+    keys = queue.Queue()
+    threading.Thread(target=read_keys, args=(keys,), daemon=True).start()
+    while True:
+        dirty = False
+        while not keys.empty():
+            viewport.scroll(keys.get())
+            dirty = True
+        # Apply every queued message before drawing, so bursts cost one redraw.
+        while connection.poll(0 if dirty else 0.05):
+            message = json.loads(connection.recv_bytes().decode('utf-8'))
+            if message.get("type") == "close":
+                return
+            viewport.apply(message)
+            dirty = True
+        if dirty or shutil.get_terminal_size() != viewport.size:
+            viewport.draw()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Display window for the UAAL text-based UI.")
+    parser.add_argument("--address", required=True, help="Socket or pipe address announced by the engine.")
+    parser.add_argument("--authkey-file", help=f"File holding the hex key shared with the engine (default: ${AUTHKEY_ENV}).")
+    args = parser.parse_args()
+    # Kept off the command line, where other local users could read it.
+    if args.authkey_file:
+        with open(args.authkey_file, 'r', encoding='utf-8') as f:
+            authkey = f.read().strip()
+    else:
+        authkey = os.environ.pop(AUTHKEY_ENV, None)
+    if not authkey:
+        parser.error(f"No key: set {AUTHKEY_ENV} or pass --authkey-file.")
+
+    enable_ansi()
+    viewport = Viewport()
+    viewport.apply({"type": "frame", "lines": [
+        "--- UAAL Renderer Initialized ---", "", "--- Waiting for UI data from the main application... ---",
+    ]})
+    viewport.draw()
+    try:
+        connection = connect(args.address, bytes.fromhex(authkey))
+    except Exception as e:
+        print(f"An error occurred in the display renderer: {e}")
+        time.sleep(5)
+        return
+
+    terminal_state = None
+    if not IS_WINDOWS and sys.stdin.isatty():
+        import termios
+        import tty
+        terminal_state = termios.tcgetattr(sys.stdin.fileno())
+        tty.setcbreak(sys.stdin.fileno())
+    sys.stdout.write(HIDE_CURSOR)
+    try:
+        with connection:
+            run(connection, viewport)
+    except (EOFError, OSError):
+        print("\n--- The main application has disconnected. ---")
+        time.sleep(2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout.write(SHOW_CURSOR)
+        sys.stdout.flush()
+        if terminal_state is not None:
+            import termios
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, terminal_state)
+
+if __name__ == "__main__":
+    main()
@@ -1,300 +1,552 @@
-# main.py
-
-import logging
-from uaal_engine.windows_driver import WindowsDriver
-from uaal_engine.browser_driver import BrowserDriver
-from uaal_engine.semantic_analyzer import SemanticAnalyzer
-from uaal_engine.api_analyzer import APIAnalyzer
-from uaal_engine.logger_setup import setup_logger
-from uaal_engine.renderer import DualTerminalRenderer
-from onboarding import start_onboarding
-import json
-import time
-
-def run_agentic_mode(driver, analyzer, context_window):
-    """
-    Runs the agent in a self-contained mode where it formulates and executes
-    a plan based on a single high-level goal.
-    """
-    if isinstance(driver, BrowserDriver):
-        logging.warning("Agentic mode for web is a future enhancement.")
-        return
-    USER_GOAL = input("\nPlease state your high-level goal for the AI: ")
-    logging.info(f"AGENT: Received goal: '{USER_GOAL}'")
-    
-    logging.info("PERCEIVING: Analyzing current UI state...")
-    ui_dom_result = driver.get_ui_dom(context_window=context_window, apply_limits=True)
-    analyzed_dom = analyzer.analyze_dom(ui_dom_result["dom"])
-    if not analyzed_dom:
-        logging.error("AGENT: Could not analyze the UI. Aborting.")
-        return
-
-    plan = analyzer.generate_plan(USER_GOAL, analyzed_dom)
-    if not plan:
-        logging.error("AGENT: Could not generate a plan. Aborting.")
-        return
-
-    logging.info("AGENT: I have a plan:")
-    logging.info(json.dumps(plan, indent=2))
-    logging.info("AGENT: Executing plan...")
-    dom_map = {item["short_selector"]: item["internal_selector"] for item in analyzed_dom}
-    for step in plan:
-        internal_selector = dom_map.get(step.get('short_selector'))
-        if not internal_selector:
-            logging.error(f"Could not find selector '{step.get('short_selector')}' from plan.")
-            continue
-        
-        if step.get("command") == "click":
-            driver.click(auto_id=internal_selector)
-        elif step.get("command") == "type":
-            driver.type_text(auto_id=internal_selector, text=step['text'])
-        time.sleep(0.5)
-    
-    logging.info("AGENT: Plan execution complete.")
-
-
-def _execute_assisted_command(command_str, driver, dom_map, is_web):
-    """Helper to execute a parsed command string."""
-    parts = command_str.strip().lower().split()
-    action = parts[0] if parts else ''
-    if not action: return {'action_taken': False}
-
-    special_actions = ["back", "forward", "refresh", "minimize", "maximize", "close"]
-    if action in special_actions:
-        if hasattr(driver, action):
-            getattr(driver, action)()
-            if action == 'close' and not is_web: return {'action_taken': True, 'should_break': True}
-            return {'action_taken': True}
-        else:
-            logging.warning(f"Action '{action}' is not supported by the current driver.")
-            return {'action_taken': False}
-    
-    elif action == "navigate":
-        if is_web and len(parts) > 1:
-            driver.navigate(parts[1])
-            return {'action_taken': True}
-        else:
-            logging.warning("'navigate' is for web targets and requires a URL.")
-            return {'action_taken': False}
-    
-    elif action == "press":
-        if len(parts) > 1:
-            driver.press_key("+".join(parts[1:]))
-            return {'action_taken': True}
-        else:
-            logging.error("Invalid 'press' command. Must include key(s) to press.")
-            return {'action_taken': False}
-
-    elif action == "click":
-        if len(parts) < 2:
-            logging.error("Invalid 'click' command. Must include a selector.")
-            return {'action_taken': False}
-        short_selector = parts[1]
-        internal_selector = dom_map.get(short_selector)
-        if not internal_selector:
-            logging.error(f"Selector '{short_selector}' not found.")
-            return {'action_taken': False}
-        if is_web: driver.click(selector=internal_selector)
-        else: driver.click(auto_id=internal_selector)
-        return {'action_taken': True}
-
-    elif action == "type":
-        if len(parts) < 2:
-            logging.error("Invalid 'type' command. Must include text to type.")
-            return {'action_taken': False}
-
-        text_to_type_parts = parts[1:]
-        target_selector = None
-        potential_selector = parts[1]
-
-        if potential_selector in dom_map:
-            target_selector = dom_map.get(potential_selector)
-            text_to_type_parts = parts[2:]
-        
-        text_to_type = " ".join(text_to_type_parts)
-
-        if target_selector:
-            if is_web: driver.type_text(selector=target_selector, text=text_to_type)
-            else: driver.type_text(auto_id=target_selector, text=text_to_type)
-        else:
-            if hasattr(driver, 'type_global'):
-                driver.type_global(text=text_to_type)
-            else:
-                logging.warning(f"Typing without a selector is not supported by this driver.")
-        
-        return {'action_taken': True}
-
-    return {'action_taken': False}
-
-
-def run_assisted_mode(driver, renderer, analyzer, context_window, assisted_type="analyzed"):
-    is_web = isinstance(driver, BrowserDriver)
-    current_dom = None
-    dom_map = {} 
-    
-    valid_actions = ['click', 'type', 'press', 'navigate', 'exit', 'help', 'rescan', 'switch',
-                     'back', 'forward', 'refresh', 'minimize', 'maximize', 'close']
-
-    while True:
-        if current_dom is None:
-            logging.info("PERCEIVING: Analyzing current UI state...")
-            apply_limits = (assisted_type == "analyzed")
-
-            perception_result = driver.get_ui_dom(context_window=context_window, apply_limits=apply_limits)
-            ui_dom = perception_result["dom"]
-            captcha_detected = perception_result.get("captcha_detected", False)
-
-            if captcha_detected:
-                logging.warning("="*50)
-                logging.warning("!!! CAPTCHA DETECTED !!!")
-                logging.warning("The script will now pause. Please switch to the browser")
-                logging.warning("window, solve the CAPTCHA, then return to this terminal.")
-                logging.warning("="*50)
-                input("--> After solving, press Enter here to continue...")
-                current_dom = None
-                continue
-            
-            if assisted_type == "analyzed":
-                current_dom = analyzer.analyze_dom(ui_dom)
-            else:
-                current_dom = ui_dom
-
-            if not current_dom: 
-                logging.error("Could not get or analyze the DOM.")
-                time.sleep(2)
-                continue
-            
-            dom_map = {item["short_selector"]: item.get("internal_selector") for item in current_dom}
-            renderer.update(current_dom)
-            
-            logging.info(f"--- Current UI State ({assisted_type.upper()}) ---")
-            display_dom = [{k: v for k, v in item.items() if k != 'internal_selector'} for item in current_dom]
-            logging.info(json.dumps(display_dom, indent=2))
-        
-        logging.info("AWAITING COMMAND...")
-        command_str = input("> ").strip()
-        if not command_str: continue
-
-        parts = command_str.lower().split()
-        action = parts[0] if parts else ''
-
-        try:
-            result = None
-            if action == 'help':
-                help_text = """
---- Available Commands ---
-- click <selector>          : Clicks an element (e.g., click b1).
-- type <text>               : Types text into the focused element (e.g., Notepad).
-- type <selector> <text>    : Types text into a specific element.
-- press <keys>              : Presses a key or combination (e.g., press ctrl s).
-- navigate <url>            : (Web Only) Navigates to a new URL.
-- switch <type> <id>        : Switches to new target (e.g., switch desktop Calculator).
-- rescan                    : Forces a refresh of the current UI view.
-- help                      : Displays this help message.
-- exit                      : Ends the entire session.
---------------------------"""
-                for line in help_text.strip().split('\n'):
-                    logging.info(line.strip())
-                continue
-            
-            if action == 'switch':
-                if len(parts) < 3:
-                    logging.error("Invalid switch command. Usage: switch <type> <identifier>")
-                    continue
-                target_type = parts[1]
-                identifier = " ".join(parts[2:])
-                if target_type not in ['desktop', 'web']:
-                    logging.error("Invalid target type. Must be 'desktop' or 'web'.")
-                    continue
-                return {'action': 'switch', 'target': {'type': target_type, 'identifier': identifier}}
-
-            if action in ['exit', 'quit']:
-                return {'action': 'exit'}
-
-            if action == 'rescan':
-                current_dom = None
-                continue
-
-            if action in valid_actions:
-                result = _execute_assisted_command(command_str, driver, dom_map, is_web)
-            else:
-                # AI Fallback Logic (if implemented)
-                logging.warning(f"Unknown command: '{action}'")
-                result = {'action_taken': False}
-
-            if result and result.get('action_taken'):
-                current_dom = None
-                if result.get('should_break'):
-                    return {'action': 'exit'}
-                time.sleep(1.5)
-
-        except (IndexError, Exception) as e:
-            logging.error(f"Error executing command '{command_str}': {e}")
-    
-    return {'action': 'exit'}
-
-
-def main():
-    setup_logger()
-    config = start_onboarding()
-    
-    driver = None
-    renderer = DualTerminalRenderer()
-
-    try:
-        while True:
-            session_result = None
-            try:
-                target_type = config["target"]["type"]
-                if target_type == "desktop":
-                    driver = WindowsDriver()
-                elif target_type == "web":
-                    driver = BrowserDriver()
-
-                analyzer = None
-                if config["mode"] in ["agentic", "assisted"]:
-                    model_config = config.get("model_config")
-                    if model_config and model_config["type"] == "local":
-                        analyzer = SemanticAnalyzer(model_name=model_config["details"]["name"])
-                    elif model_config and model_config["type"] == "api":
-                        analyzer = APIAnalyzer(api_key=model_config["details"]["api_key"])
-                
-                if not driver or not analyzer:
-                    logging.critical("Driver or Analyzer could not be initialized. Exiting.")
-                    return
-
-                driver.connect_to_app(config["target"]["identifier"])
-                
-                model_context_window = config.get("model_config", {}).get("details", {}).get("context_window", 8192)
-
-                run_mode_args = { 
-                    "driver": driver, 
-                    "renderer": renderer,
-                    "analyzer": analyzer, 
-                    "context_window": model_context_window 
-                }
-
-                if config["mode"] == "assisted":
-                    run_mode_args["assisted_type"] = config.get("assisted_type", "raw")
-                    session_result = run_assisted_mode(**run_mode_args)
-                else:
-                    run_agentic_mode(**run_mode_args)
-                    session_result = {'action': 'exit'}
-
-            finally:
-                if driver and hasattr(driver, 'cleanup'):
-                    driver.cleanup()
-                    logging.info("Driver for the current session has been cleaned up.")
-
-            if session_result and session_result.get('action') == 'switch':
-                config['target'] = session_result['target']
-                logging.info(f"--- SWITCHING TARGET TO: {config['target']['identifier']} ---")
-            else:
-                break
-
-    finally:
-        renderer.close()
-        logging.info("AGENT: Session ended.")
-
-if __name__ == "__main__":
+# main.py
+
+import logging
+from uaal_engine import compact_dom, macros, registry
+from uaal_engine.heuristic_analyzer import HeuristicAnalyzer
+from uaal_engine.logger_setup import setup_logger
+from uaal_engine.renderer import DualTerminalRenderer
+from uaal_engine.command_resolver import CommandResolver
+from uaal_engine.plan_store import PlanStore, dom_signature, attach_expectations, step_matches
+from uaal_engine.perception_pipeline import PerceptionPipeline
+from uaal_engine.session_manager import SessionManager, limits_from_env
+from uaal_engine import telemetry
+from uaal_engine import session_recorder
+from onboarding import start_onboarding
+import json
+import queue
+import threading
+import time
+
+def _plan_step_to_command(step):
+    """Turns a plan step into the equivalent assisted-mode command string."""
+    command = step.get("command")
+    selector = step.get("short_selector")
+    text = step.get("text") or ""
+    if command == "click":
+        return f"click {selector}"
+    if command == "type":
+        return f"type {selector} {text}" if selector else f"type {text}"
+    return f"{command} {text}".strip()
+
+
+def _model_plan(analyzer, goal, ui_dom):
+    ui_dom = compact_dom.to_list(ui_dom)
+    analyzed_dom = analyzer.analyze_dom(ui_dom)
+    if not analyzed_dom:
+        logging.error("AGENT: Could not analyze the UI.")
+        return None
+    plan = attach_expectations(analyzer.generate_plan(goal, analyzed_dom), ui_dom)
+    if not plan:
+        logging.error("AGENT: Could not generate a plan.")
+        return None
+    return plan
+
+
+def _perceive(driver, context_window, apply_limits):
+    start = time.perf_counter()
+    with telemetry.span("get_ui_dom"):
+        perception_result = driver.get_ui_dom(context_window=context_window, apply_limits=apply_limits)
+    session_recorder.record(
+        "perception", dom=perception_result["dom"],
+        captcha_detected=perception_result.get("captcha_detected", False),
+        seconds=round(time.perf_counter() - start, 4)
+    )
+    return perception_result
+
+
+def run_agentic_mode(driver, renderer, analyzer, context_window, target=None, plan_store=None, goal=None):
+    """
+    Runs the agent in a self-contained mode where it formulates and executes
+    a plan based on a single high-level goal. Plans are cached per target,
+    goal and UI structure, so a repeated goal replays without a model call.
+    """
+    is_web = driver.is_web
+    plan_store = plan_store or PlanStore()
+    target_id = (target or {}).get("identifier", "")
+    USER_GOAL = goal or input("\nPlease state your high-level goal for the AI: ")
+    session_recorder.record("goal", goal=USER_GOAL)
+    logging.info(f"AGENT: Received goal: '{USER_GOAL}'")
+    
+    logging.info("PERCEIVING: Analyzing current UI state...")
+    ui_dom = _perceive(driver, context_window, apply_limits=True)["dom"]
+    signature = dom_signature(ui_dom)
+
+    plan = plan_store.get(target_id, USER_GOAL, signature)
+    from_cache = plan is not None
+    # A model plan for the initial UI is stored only after every one of its steps has run.
+    store_plan = not from_cache
+    if from_cache:
+        logging.info("AGENT: Found a stored plan for this goal and UI. Replaying without the model.")
+    else:
+        plan = _model_plan(analyzer, USER_GOAL, ui_dom)
+        if not plan:
+            logging.error("AGENT: Aborting.")
+            return
+
+    logging.info("AGENT: I have a plan:")
+    logging.info(json.dumps(plan, indent=2))
+    logging.info("AGENT: Executing plan...")
+    step_index, failed = 0, False
+    while step_index < len(plan):
+        step = plan[step_index]
+        if step_index > 0:
+            ui_dom = _perceive(driver, context_window, apply_limits=True)["dom"]
+        if not step_matches(step, ui_dom):
+            if not from_cache:
+                logging.error(f"Could not find selector '{step.get('short_selector')}' from plan.")
+                failed = True
+                step_index += 1
+                continue
+            logging.warning(f"AGENT: Stored step {step_index + 1} no longer matches the live UI: {step}")
+            plan_store.discard(target_id, USER_GOAL, signature)
+            logging.info("AGENT: Falling back to model planning from the current UI state.")
+            plan = _model_plan(analyzer, USER_GOAL, ui_dom)
+            if not plan:
+                logging.error("AGENT: Aborting.")
+                return
+            store_plan = step_index == 0
+            from_cache, step_index, failed = False, 0, False
+            continue
+
+        dom_map = compact_dom.selector_map(ui_dom)
+        command_str = _plan_step_to_command(step)
+        logging.info(f"AGENT: Step {step_index + 1}/{len(plan)}: {command_str}")
+        # Typed text goes through exactly as planned, even if it starts with a selector-like word.
+        typed_text = (step.get("text") or "") if step.get("command") == "type" else None
+        result = _execute_assisted_command(command_str, driver, dom_map, is_web, text=typed_text)
+        if not result.get('action_taken'):
+            logging.error(f"AGENT: Step '{command_str}' could not be executed.")
+            failed = True
+            if from_cache:
+                # Its selectors still match, so it would otherwise be replayed on every run.
+                plan_store.discard(target_id, USER_GOAL, signature)
+        step_index += 1
+        if result.get('should_break'):
+            break
+        time.sleep(0.5)
+
+    if store_plan and not failed and step_index == len(plan):
+        plan_store.put(target_id, USER_GOAL, signature, plan)
+    logging.info("AGENT: Plan execution complete.")
+
+
+def _execute_assisted_command(command_str, driver, dom_map, is_web, text=None):
+    """Helper to execute a parsed command string. text, if given, is typed instead of the command's own text."""
+    parts = command_str.strip().lower().split()
+    action = parts[0] if parts else ''
+    if not action: return {'action_taken': False}
+    if action == 'type' and text is None:
+        # Only the action and selector are case-insensitive; typed text goes through as entered.
+        text = macros.type_arguments(command_str.strip(), dom_map)[1]
+    with telemetry.span(f"action.{action}"):
+        result = _dispatch_assisted_command(parts, action, driver, dom_map, is_web, text)
+    session_recorder.record("command", command=command_str, result=result)
+    return result
+
+
+def _execute_macro(commands, driver, dom_map, is_web):
+    """
+    Runs chained commands (see macros.split) through the driver's run_macro,
+    or one by one without it. Only the interactive loop and the daemon chain
+    commands; plan steps and batch lines are always single commands.
+    """
+    with telemetry.span("action.macro", steps=len(commands)):
+        result = _run_macro(commands, driver, dom_map, is_web)
+    session_recorder.record("command", command=f"{macros.SEPARATOR} ".join(commands), result=result)
+    return result
+
+
+def _run_macro(commands, driver, dom_map, is_web):
+    try:
+        steps = macros.build_steps(commands, dom_map)
+    except ValueError as e:
+        logging.error(f"Macro not run: {e}")
+        return {'action_taken': False}
+
+    if hasattr(driver, 'run_macro'):
+        macro, settled = driver.run_macro(steps), True
+    else:
+        start, results = time.perf_counter(), []
+        for command, step in zip(commands, steps):
+            step_start = time.perf_counter()
+            parts = command.lower().split()
+            taken = _dispatch_assisted_command(parts, parts[0], driver, dom_map, is_web, step.get("text")).get('action_taken')
+            results.append(macros.step_result(step["action"], step_start, None if taken else "not executed"))
+            if not taken: break
+        macro, settled = macros.summary(results, len(steps), start), False
+
+    logging.info(f"Macro: {macro['completed']}/{len(steps)} steps in {macro['seconds'] * 1000:.0f} ms.")
+    if not macro['ok']:
+        failed = next(i for i, step in enumerate(macro['steps']) if not step['ok'])
+        logging.error(f"Macro stopped at '{commands[failed]}': {macro['steps'][failed].get('error')}")
+    return {'action_taken': macro['completed'] > 0, 'settled': settled, 'macro': macro}
+
+
+def _resolve_commands(resolver, command_str, dom_map, fallback=None):
+    """
+    Corrects malformed commands with the resolver, each command of a macro on
+    its own. Returns None when one of them cannot be interpreted.
+    """
+    corrected = []
+    for command in macros.split(command_str) or [command_str]:
+        if resolver.is_well_formed(command.lower().split(), dom_map):
+            corrected.append(command)
+            continue
+        resolved = resolver.resolve(command, fallback=fallback)
+        if not resolved:
+            return None
+        if resolved.lower() != command.lower():
+            logging.info(f"Interpreted '{command}' as '{resolved}'.")
+        corrected.append(resolved)
+    return f"{macros.SEPARATOR} ".join(corrected)
+
+
+def _dispatch_assisted_command(parts, action, driver, dom_map, is_web, text=None):
+    special_actions = ["back", "forward", "refresh", "minimize", "maximize", "close"]
+    if action in special_actions:
+        if hasattr(driver, action):
+            getattr(driver, action)()
+            if action == 'close' and not is_web: return {'action_taken': True, 'should_break': True}
+            return {'action_taken': True}
+        else:
+            logging.warning(f"Action '{action}' is not supported by the current driver.")
+            return {'action_taken': False}
+    
+    elif action == "navigate":
+        if is_web and len(parts) > 1:
+            driver.navigate(parts[1])
+            return {'action_taken': True}
+        else:
+            logging.warning("'navigate' is for web targets and requires a URL.")
+            return {'action_taken': False}
+    
+    elif action == "press":
+        if len(parts) > 1:
+            driver.press_key("+".join(parts[1:]))
+            return {'action_taken': True}
+        else:
+            logging.error("Invalid 'press' command. Must include key(s) to press.")
+            return {'action_taken': False}
+
+    elif action == "click":
+        if len(parts) < 2:
+            logging.error("Invalid 'click' command. Must include a selector.")
+            return {'action_taken': False}
+        short_selector = parts[1]
+        internal_selector = dom_map.get(short_selector)
+        if not internal_selector:
+            logging.error(f"Selector '{short_selector}' not found.")
+            return {'action_taken': False}
+        if is_web: driver.click(selector=internal_selector)
+        else: driver.click(auto_id=internal_selector)
+        return {'action_taken': True}
+
+    elif action == "type":
+        if len(parts) < 2:
+            logging.error("Invalid 'type' command. Must include text to type.")
+            return {'action_taken': False}
+
+        text_to_type_parts = parts[1:]
+        target_selector = None
+        potential_selector = parts[1]
+
+        if potential_selector in dom_map:
+            target_selector = dom_map.get(potential_selector)
+            text_to_type_parts = parts[2:]
+        
+        text_to_type = " ".join(text_to_type_parts) if text is None else text
+
+        if target_selector:
+            if is_web: driver.type_text(selector=target_selector, text=text_to_type)
+            else: driver.type_text(auto_id=target_selector, text=text_to_type)
+        else:
+            if hasattr(driver, 'type_global'):
+                driver.type_global(text=text_to_type)
+            else:
+                logging.warning(f"Typing without a selector is not supported by this driver.")
+        
+        return {'action_taken': True}
+
+    return {'action_taken': False}
+
+
+class _ConsoleReader:
+    """Reads console lines on a daemon thread so commands can be typed while the engine works."""
+    def __init__(self):
+        self.lines = queue.Queue()
+        threading.Thread(target=self._read_forever, daemon=True).start()
+
+    def _read_forever(self):
+        while True:
+            try:
+                self.lines.put(input("> "))
+            except EOFError:
+                self.lines.put("exit")
+                return
+
+    def has_pending(self):
+        return not self.lines.empty()
+
+    def get(self):
+        line = self.lines.get()
+        session_recorder.record("input", text=line)
+        return line
+
+
+_console_reader = None
+
+def _get_console_reader():
+    global _console_reader
+    if _console_reader is None:
+        _console_reader = _ConsoleReader()
+    return _console_reader
+
+
+def _settle(driver):
+    """Waits for the target to finish reacting to the last action."""
+    if hasattr(driver, 'settle'):
+        driver.settle()
+    else:
+        time.sleep(1.5)
+
+
+ASSISTED_ACTIONS = ['click', 'type', 'press', 'navigate', 'exit', 'help', 'rescan', 'switch',
+                    'back', 'forward', 'refresh', 'minimize', 'maximize', 'close', 'stats', 'find']
+
+
+def run_assisted_mode(driver, renderer, analyzer, context_window, assisted_type="analyzed", reader=None,
+                      session=None):
+    is_web = driver.is_web
+    needs_perception, needs_settle = True, False
+    dom_map = {} 
+    reader = reader or _get_console_reader()
+    pipeline = PerceptionPipeline(
+        renderer, analyzer, assisted_type, analysis_cache=session.analysis_cache if session else None
+    )
+    
+    valid_actions = ASSISTED_ACTIONS
+    if session:
+        # Kept on the session so its correction memo survives switching away and back.
+        resolver = session.state.setdefault("resolver", CommandResolver(valid_actions))
+    else:
+        resolver = CommandResolver(valid_actions)
+
+    try:
+        while True:
+            if needs_perception:
+                if needs_settle:
+                    _settle(driver)
+                    needs_settle = False
+                logging.info("PERCEIVING: Analyzing current UI state...")
+                apply_limits = (assisted_type == "analyzed")
+
+                perception_result = _perceive(driver, context_window, apply_limits)
+                ui_dom = perception_result["dom"]
+                captcha_detected = perception_result.get("captcha_detected", False)
+
+                if captcha_detected:
+                    logging.warning("="*50)
+                    logging.warning("!!! CAPTCHA DETECTED !!!")
+                    logging.warning("The script will now pause. Please switch to the browser")
+                    logging.warning("window, solve the CAPTCHA, then return to this terminal.")
+                    logging.warning("="*50)
+                    logging.warning("--> After solving, press Enter here to continue...")
+                    reader.get()
+                    continue
+
+                if not ui_dom: 
+                    logging.error("Could not get the DOM.")
+                    time.sleep(2)
+                    continue
+                
+                # Selectors come from the raw DOM, so commands typed while analysis
+                # and rendering are still running are checked against this perception.
+                dom_map = compact_dom.selector_map(ui_dom)
+                with telemetry.span("index", elements=len(ui_dom)):
+                    resolver.index(ui_dom)
+                pipeline.submit(ui_dom)
+                needs_perception = False
+            
+            if not reader.has_pending():
+                logging.info("AWAITING COMMAND...")
+            command_str = reader.get().strip()
+            if not command_str: continue
+
+            parts = command_str.lower().split()
+            action = parts[0] if parts else ''
+
+            if action != 'quit':
+                # Cheap local correction first; only low-confidence input costs a model call.
+                resolved = _resolve_commands(
+                    resolver, command_str, dom_map,
+                    fallback=lambda raw: pipeline.run_exclusive(
+                        analyzer.interpret_command, raw, valid_actions, compact_dom.to_list(pipeline.display_dom())
+                    )
+                )
+                if resolved:
+                    command_str = resolved
+                    parts = command_str.lower().split()
+                    action = parts[0] if parts else ''
+
+            try:
+                result = None
+                if action == 'help':
+                    help_text = """
+--- Available Commands ---
+- click <selector>          : Clicks an element (e.g., click b1).
+- click "<text>"            : Clicks the element best matching the text (e.g., click "Sign in").
+- type <text>               : Types text into the focused element (e.g., Notepad).
+- type <selector> <text>    : Types text into a specific element.
+- find <words>              : Lists the elements best matching the words, with their selectors.
+- press <keys>              : Presses a key or combination (e.g., press ctrl s).
+- <command>; <command>; ... : Runs click/type/press commands back to back (e.g., type i1 ann; click b2).
+- navigate <url>            : (Web Only) Navigates to a new URL.
+- switch <type> <id>        : Switches to new target (e.g., switch desktop Calculator).
+- rescan                    : Forces a refresh of the current UI view.
+- stats                     : Shows timing percentiles per phase (needs UAAL_METRICS).
+- help                      : Displays this help message.
+- exit                      : Ends the entire session.
+--------------------------"""
+                    for line in help_text.strip().split('\n'):
+                        logging.info(line.strip())
+                    continue
+                
+                if action == 'switch':
+                    if len(parts) < 3:
+                        logging.error("Invalid switch command. Usage: switch <type> <identifier>")
+                        continue
+                    target_type = parts[1]
+                    identifier = " ".join(parts[2:])
+                    if target_type not in registry.driver_types():
+                        logging.error(f"Invalid target type. Must be one of: {', '.join(registry.driver_types())}.")
+                        continue
+                    return {'action': 'switch', 'target': {'type': target_type, 'identifier': identifier}}
+
+                if action in ['exit', 'quit']:
+                    return {'action': 'exit'}
+
+                if action == 'stats':
+                    for line in telemetry.format_summary():
+                        logging.info(line)
+                    continue
+
+                if action == 'find':
+                    query = command_str.split(maxsplit=1)[1] if len(parts) > 1 else ""
+                    matches = resolver.find(query)
+                    if not matches:
+                        logging.info(f"No elements match '{query}'.")
+                    for score, item in matches:
+                        logging.info(f"  [{item['short_selector']}] {item.get('tag')}: {item.get('text', '')}  ({score:.2f})")
+                    continue
+
+                if action == 'rescan':
+                    needs_perception = True
+                    continue
+
+                chain = macros.split(command_str)
+                if chain:
+                    result = _execute_macro(chain, driver, dom_map, is_web)
+                elif action in valid_actions:
+                    result = _execute_assisted_command(command_str, driver, dom_map, is_web)
+                else:
+                    # Neither the local resolver nor the analyzer could interpret it.
+                    logging.warning(f"Unknown command: '{action}'")
+                    result = {'action_taken': False}
+
+                if result and result.get('action_taken'):
+                    # Macros run by the driver have already settled.
+                    needs_perception, needs_settle = True, not result.get('settled')
+                    if result.get('should_break'):
+                        return {'action': 'exit'}
+
+            except (IndexError, Exception) as e:
+                logging.error(f"Error executing command '{command_str}': {e}")
+    finally:
+        pipeline.close()
+    
+    return {'action': 'exit'}
+
+
+def _create_driver(target):
+    """Builds and connects a driver for a {'type', 'identifier'} target."""
+    driver = registry.create_driver(target["type"])
+    with telemetry.span("connect", target=target["identifier"]):
+        driver.connect_to_app(target["identifier"])
+    return driver
+
+
+def _create_analyzer(config):
+    analyzer = None
+    if config["mode"] in ["agentic", "assisted"]:
+        model_config = config.get("model_config")
+        if model_config:
+            # Only the selected backend is imported; torch is never loaded for an API model.
+            analyzer = registry.create_analyzer(model_config)
+        if analyzer and config.get("assisted_type") != "raw":
+            # Obvious elements are labeled by rules; only the rest reach the model,
+            # and in heuristic mode the model is kept for command interpretation only.
+            analyzer = HeuristicAnalyzer(
+                fallback=analyzer, tiered=config.get("assisted_type") != "heuristic"
+            )
+        elif not model_config and config.get("assisted_type") == "heuristic":
+            # Standalone: rules only, no model to load.
+            analyzer = HeuristicAnalyzer(fallback=None)
+    if analyzer and session_recorder.is_enabled():
+        analyzer = session_recorder.RecordingAnalyzer(analyzer)
+    return analyzer
+
+
+def main():
+    setup_logger()
+    telemetry.enable_from_env()
+    session_recorder.enable_from_env()
+    registry.load_plugins()
+    config = start_onboarding()
+    
+    renderer = DualTerminalRenderer()
+    max_sessions, max_memory_mb = limits_from_env()
+    sessions = SessionManager(_create_driver, max_sessions=max_sessions, max_memory_mb=max_memory_mb)
+
+    try:
+        # The analyzer (and any model it holds) is loaded once and shared by every session.
+        analyzer = _create_analyzer(config)
+        if not analyzer:
+            logging.critical("Driver or Analyzer could not be initialized. Exiting.")
+            return
+
+        while True:
+            session = sessions.get(config["target"])
+            model_context_window = config.get("model_config", {}).get("details", {}).get("context_window", 8192)
+            session_recorder.record(
+                "session", target=config["target"], mode=config["mode"],
+                assisted_type=config.get("assisted_type", "raw"), context_window=model_context_window
+            )
+
+            run_mode_args = { 
+                "driver": session.driver, 
+                "renderer": renderer,
+                "analyzer": analyzer, 
+                "context_window": model_context_window 
+            }
+
+            if config["mode"] == "assisted":
+                run_mode_args["assisted_type"] = config.get("assisted_type", "raw")
+                session_result = run_assisted_mode(**run_mode_args, session=session)
+            else:
+                run_agentic_mode(**run_mode_args, target=config["target"])
+                session_result = {'action': 'exit'}
+
+            if session_result and session_result.get('action') == 'switch':
+                config['target'] = session_result['target']
+                logging.info(f"--- SWITCHING TARGET TO: {config['target']['identifier']} ---")
+            else:
+                break
+
+    finally:
+        sessions.close_all()
+        renderer.close()
+        session_recorder.close()
+        logging.info("AGENT: Session ended.")
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
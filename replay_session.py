@@ -0,0 +1,261 @@
+# replay_session.py
+
+"""
+Deterministic offline replay of a recorded UAAL session.
+
+Feeds a recording made with UAAL_RECORD=1 (or =path) back through the real
+engine loop: perceived DOMs come from a stub driver, analyzer responses
+from a stub analyzer and console input from the recorded lines. No browser,
+desktop app or model is needed, so slow or misbehaving sessions can be
+profiled and re-run as regression tests. The commands the engine executes
+are compared with the recorded ones; any divergence exits with code 1.
+
+Usage:
+    python replay_session.py uaal_session_20240101_120000.jsonl.gz [--realtime] [--profile replay.prof]
+
+Set UAAL_METRICS=1 to print per-phase timing percentiles at the end.
+"""
+
+import argparse
+import collections
+import cProfile
+import hashlib
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import time
+from uaal_engine import session_recorder, telemetry
+from uaal_engine.plan_store import PlanStore
+from uaal_engine.renderer import DualTerminalRenderer
+from main import run_assisted_mode, run_agentic_mode
+
+
+def _request_key(method, request):
+    payload = json.dumps(request, sort_keys=True, default=str)
+    return method, hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ReplayDriver:
+    """Serves recorded perceptions in order and logs every action instead of performing it."""
+    is_web = False
+
+    def __init__(self, perceptions, realtime=False):
+        self.perceptions = collections.deque(perceptions)
+        self.last = {"dom": [], "captcha_detected": False}
+        self.realtime = realtime
+        self.calls = []
+        self.served = 0
+
+    def connect_to_app(self, identifier):
+        self.calls.append(("connect_to_app", identifier))
+
+    def settle(self):
+        pass
+
+    def get_ui_dom(self, context_window=4096, apply_limits=True):
+        if self.perceptions:
+            event = self.perceptions.popleft()
+            if self.realtime:
+                time.sleep(event.get("seconds", 0))
+            self.last = {"dom": event.get("dom") or [], "captcha_detected": event.get("captcha_detected", False)}
+            self.served += 1
+        return self.last
+
+    def click(self, selector=None, auto_id=None):
+        self.calls.append(("click", selector or auto_id))
+
+    def type_text(self, selector=None, auto_id=None, text=""):
+        self.calls.append(("type_text", selector or auto_id, text))
+
+    def press_key(self, key_combination):
+        self.calls.append(("press_key", key_combination))
+
+    def cleanup(self):
+        pass
+
+
+class ReplayBrowserDriver(ReplayDriver):
+    is_web = True
+
+    def navigate(self, url):
+        self.calls.append(("navigate", url))
+
+    def back(self):
+        self.calls.append(("back",))
+
+    def forward(self):
+        self.calls.append(("forward",))
+
+    def refresh(self):
+        self.calls.append(("refresh",))
+
+
+class ReplayDesktopDriver(ReplayDriver):
+    def type_global(self, text):
+        self.calls.append(("type_global", text))
+
+    def minimize(self):
+        self.calls.append(("minimize",))
+
+    def maximize(self):
+        self.calls.append(("maximize",))
+
+    def close(self):
+        self.calls.append(("close",))
+
+
+class ReplayAnalyzer:
+    """
+    Returns recorded analyzer responses. Requests are matched by content
+    first; since background analysis can make a request differ slightly from
+    the recorded one, unmatched calls fall back to recording order.
+    """
+    def __init__(self, analyzer_events, realtime=False):
+        self.realtime = realtime
+        self.by_request = collections.defaultdict(list)
+        self.by_method = collections.defaultdict(list)
+        for event in analyzer_events:
+            self.by_request[_request_key(event["method"], event.get("request"))].append(event)
+            self.by_method[event["method"]].append(event)
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _next_unused(self, events):
+        return next((event for event in events if event["seq"] not in self.used), None)
+
+    def _respond(self, method, *args):
+        event = self._next_unused(self.by_request.get(_request_key(method, list(args)), []))
+        if event:
+            self.hits += 1
+        else:
+            self.misses += 1
+            event = self._next_unused(self.by_method[method])
+        if event is None:
+            # Live analysis skips DOMs that went stale, so a replay can ask for more than was recorded.
+            logging.info(f"REPLAY: No recorded response left for {method}; using a neutral one.")
+            if method == "analyze_dom":
+                return args[0]
+            return "unknown" if method == "interpret_command" else None
+        self.used.add(event["seq"])
+        if self.realtime:
+            time.sleep(event.get("seconds", 0))
+        return event.get("response")
+
+    def analyze_dom(self, ui_dom):
+        return self._respond("analyze_dom", ui_dom)
+
+    def interpret_command(self, command_str, valid_actions, dom_elements):
+        return self._respond("interpret_command", command_str, valid_actions, dom_elements)
+
+    def generate_plan(self, goal, ui_dom):
+        return self._respond("generate_plan", goal, ui_dom)
+
+
+class ReplayConsole:
+    """Stands in for the console reader; answers 'exit' once the recorded input runs out."""
+    def __init__(self, lines):
+        self.lines = collections.deque(lines)
+
+    def has_pending(self):
+        return bool(self.lines)
+
+    def get(self):
+        return self.lines.popleft() if self.lines else "exit"
+
+
+def split_sessions(events):
+    """Groups events by the 'session' marker written each time a target is (re)connected."""
+    segments = []
+    for event in events:
+        if event["kind"] == "session":
+            segments.append({"config": event, "events": []})
+        elif segments:
+            segments[-1]["events"].append(event)
+    return segments
+
+
+def replay(events, realtime=False):
+    """Runs every recorded segment through the engine. Returns a report dict."""
+    segments = split_sessions(events)
+    if not segments:
+        raise ValueError("The recording has no session events.")
+
+    analyzer = ReplayAnalyzer([e for e in events if e["kind"] == "analyzer"], realtime)
+    console = ReplayConsole([e["text"] for e in events if e["kind"] == "input"])
+    renderer = DualTerminalRenderer(launch_window=False)
+    recorder = session_recorder.enable()
+    plan_dir = tempfile.TemporaryDirectory(prefix="uaal_replay_")
+    perceptions = 0
+
+    start = time.perf_counter()
+    try:
+        for segment in segments:
+            config = segment["config"]
+            driver_class = ReplayBrowserDriver if config["target"]["type"] == "web" else ReplayDesktopDriver
+            driver = driver_class([e for e in segment["events"] if e["kind"] == "perception"], realtime)
+            driver.connect_to_app(config["target"]["identifier"])
+            logging.info(f"REPLAY: {config['mode']} session on {config['target']['identifier']}")
+            run_mode_args = {
+                "driver": driver, "renderer": renderer, "analyzer": analyzer,
+                "context_window": config.get("context_window", 8192),
+            }
+            if config["mode"] == "assisted":
+                run_assisted_mode(**run_mode_args, assisted_type=config.get("assisted_type", "raw"), reader=console)
+            else:
+                goal = next((e["goal"] for e in segment["events"] if e["kind"] == "goal"), "")
+                run_agentic_mode(**run_mode_args, target=config["target"], goal=goal,
+                                 plan_store=PlanStore(os.path.join(plan_dir.name, "plans.json")))
+            perceptions += driver.served
+    finally:
+        renderer.close()
+        plan_dir.cleanup()
+    elapsed = time.perf_counter() - start
+
+    expected = [(e["command"], bool(e["result"].get("action_taken"))) for e in events if e["kind"] == "command"]
+    actual = [(e["command"], bool(e["result"].get("action_taken"))) for e in recorder.events if e["kind"] == "command"]
+    divergences = [
+        {"index": i, "recorded": expected[i] if i < len(expected) else None,
+         "replayed": actual[i] if i < len(actual) else None}
+        for i in range(max(len(expected), len(actual)))
+        if i >= len(expected) or i >= len(actual) or expected[i] != actual[i]
+    ]
+    return {
+        "segments": len(segments), "perceptions": perceptions, "commands": len(actual),
+        "analyzer_hits": analyzer.hits, "analyzer_misses": analyzer.misses,
+        "seconds": round(elapsed, 3), "divergences": divergences,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded UAAL session offline.")
+    parser.add_argument("recording", help="A .jsonl or .jsonl.gz file written by the session recorder.")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Sleep for the recorded perception and analyzer durations.")
+    parser.add_argument("--profile", help="Write cProfile stats to this path and print the top entries.")
+    args = parser.parse_args()
+    # Console-only logging: the session log being investigated is left untouched.
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    telemetry.enable_from_env()
+
+    events = session_recorder.load_recording(args.recording)
+    if args.profile:
+        profiler = cProfile.Profile()
+        report = profiler.runcall(replay, events, args.realtime)
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        report = replay(events, args.realtime)
+
+    if telemetry.is_enabled():
+        for line in telemetry.format_summary():
+            logging.info(line)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["divergences"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# uaal_client.py
+
+"""
+Thin command-line client for a running uaal_daemon.py.
+
+Replaces the interactive loop for scripted use: each subcommand is one
+JSON-RPC call, and 'run' feeds a script (or stdin) through one session.
+The daemon URL and token are read from its state file.
+
+Usage:
+    python uaal_client.py open                          # prints a session id
+    python uaal_client.py --session ID switch web https://example.com
+    python uaal_client.py --session ID perceive
+    python uaal_client.py --session ID act "click b1"
+    python uaal_client.py --session ID analyze
+    python uaal_client.py --session ID find sign in
+    python uaal_client.py --session ID close
+    python uaal_client.py run workflow.txt              # or '-' for stdin
+    python uaal_client.py status
+
+UAAL_SESSION can be set instead of --session. Script lines are either
+'switch <web|desktop> <identifier>', 'perceive', 'analyze', 'find <words>'
+or an assisted command; blank lines and lines starting with '#' are skipped.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+# Kept in step with uaal_daemon.py; importing it would pull in the engine and its model libraries.
+DEFAULT_STATE_FILE = os.path.join(os.path.expanduser("~"), ".uaal_daemon.json")
+
+
+class DaemonError(Exception):
+    pass
+
+
+class DaemonClient:
+    def __init__(self, url, token, timeout=300):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.ids = itertools.count(1)
+
+    @classmethod
+    def from_state_file(cls, path=DEFAULT_STATE_FILE):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            raise DaemonError(f"No daemon state file at '{path}'. Is uaal_daemon.py running?")
+        return cls(state["url"], state["token"])
+
+    def call(self, method, **params):
+        payload = {"jsonrpc": "2.0", "id": next(self.ids), "method": method, "params": params}
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.token}"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            body = json.loads(e.read() or b"{}")
+        except urllib.error.URLError as e:
+            raise DaemonError(f"Could not reach the daemon at {self.url}: {e.reason}")
+        if "error" in body:
+            raise DaemonError(body["error"]["message"])
+        return body["result"]
+
+
+def format_dom(dom):
+    return "\n".join(f"[{item['short_selector']}] {item['tag']}: {item.get('text', '')}" for item in dom)
+
+
+def format_matches(matches):
+    return "\n".join(f"[{m['short_selector']}] {m['tag']}: {m.get('text', '')}  ({m['score']:.2f})" for m in matches)
+
+
+def run_script(client, session, lines):
+    """Executes script lines in one session. Returns the number of failed lines."""
+    failures = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split(maxsplit=2)
+        try:
+            if parts[0].lower() == "switch" and len(parts) == 3:
+                client.call("switch", session=session, type=parts[1].lower(), identifier=parts[2])
+                print(f"OK    {line}")
+            elif parts[0].lower() in ["perceive", "analyze"]:
+                print(format_dom(client.call(parts[0].lower(), session=session)["dom"]))
+            elif parts[0].lower() == "find":
+                query = line.split(maxsplit=1)[1] if len(parts) > 1 else ""
+                print(format_matches(client.call("find", session=session, query=query)["matches"]))
+            else:
+                result = client.call("act", session=session, command=line)
+                print(f"{'OK' if result['action_taken'] else 'NOOP':<5} {line}")
+        except DaemonError as e:
+            failures += 1
+            print(f"FAIL  {line}: {e}", file=sys.stderr)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send commands to a running UAAL daemon.")
+    parser.add_argument("--state-file", default=DEFAULT_STATE_FILE, help="State file written by the daemon.")
+    parser.add_argument("--session", default=os.environ.get("UAAL_SESSION"), help="Session id from 'open'.")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("open", help="Open a session and print its id.")
+    sub.add_parser("close", help="Close the session and its drivers.")
+    sub.add_parser("status", help="Show connected clients and warm targets.")
+    switch = sub.add_parser("switch", help="Connect the session to a target.")
+    switch.add_argument("type", help="Target type: web, desktop or a plugin's type.")
+    switch.add_argument("identifier")
+    perceive = sub.add_parser("perceive", help="Print the current UI elements.")
+    perceive.add_argument("--apply-limits", action="store_true", help="Apply the context-window limits.")
+    sub.add_parser("analyze", help="Print the analyzed elements of the last perception.")
+    find = sub.add_parser("find", help="List the elements best matching some words.")
+    find.add_argument("words", nargs="+")
+    act = sub.add_parser("act", help="Execute one assisted command, e.g. \"click b1\".")
+    act.add_argument("text", nargs="+")
+    run = sub.add_parser("run", help="Run a script of commands in one session.")
+    run.add_argument("script", help="Script path, or '-' for stdin.")
+    args = parser.parse_args()
+
+    try:
+        client = DaemonClient.from_state_file(args.state_file)
+        if args.command == "status":
+            result = client.call("status")
+        elif args.command == "open":
+            result = client.call("open_session")
+            print(result["session"] if not args.json else json.dumps(result))
+            return
+        elif args.command == "run":
+            session = args.session or client.call("open_session")["session"]
+            script = sys.stdin if args.script == "-" else open(args.script, 'r', encoding='utf-8')
+            try:
+                with script:
+                    failures = run_script(client, session, script)
+            finally:
+                if not args.session:
+                    client.call("close_session", session=session)
+            sys.exit(1 if failures else 0)
+        else:
+            if not args.session:
+                parser.error("--session (or UAAL_SESSION) is required; get one with 'open'.")
+            if args.command == "close":
+                result = client.call("close_session", session=args.session)
+            elif args.command == "switch":
+                result = client.call("switch", session=args.session, type=args.type, identifier=args.identifier)
+            elif args.command == "perceive":
+                result = client.call("perceive", session=args.session, apply_limits=args.apply_limits)
+            elif args.command == "analyze":
+                result = client.call("analyze", session=args.session)
+            elif args.command == "find":
+                result = client.call("find", session=args.session, query=" ".join(args.words))
+            else:
+                result = client.call("act", session=args.session, command=" ".join(args.text))
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if "dom" in result and not args.json:
+        print(format_dom(result["dom"]))
+    elif "matches" in result and not args.json:
+        print(format_matches(result["matches"]))
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+# uaal_daemon.py
+
+"""
+Long-lived UAAL daemon with a local JSON-RPC 2.0 API.
+
+Loads the analyzer (and any model behind it) once and keeps drivers
+resident, so scripted clients skip torch/transformers import, model load,
+browser launch and onboarding on every run. Listens on 127.0.0.1 only;
+each request must carry the bearer token written to the state file.
+
+Every client opens its own session, which owns a SessionManager (one warm
+driver per target) and a dedicated worker thread: Playwright's sync API
+and pywinauto's COM objects must be used from the thread that created
+them. The shared analyzer is serialized with a lock.
+
+Methods (params in brackets):
+    open_session                      -> {"session"}
+    close_session [session]
+    switch        [session, type, identifier]
+    perceive      [session, apply_limits=false] -> {"dom", "captcha_detected"}
+    act           [session, command]  -> {"action_taken", "rescanned", "command"}
+    find          [session, query, limit=10] -> {"matches"} (ranked elements)
+    analyze       [session]           -> {"dom"} (analyzed last perception)
+    status
+
+Usage:
+    python uaal_daemon.py --config daemon.json [--port 8765] [--state-file ~/.uaal_daemon.json]
+
+Config file (JSON), the same model settings onboarding produces:
+    {"model_config": {"type": "api", "details": {"api_key": "..."}},
+     "assisted_type": "analyzed", "headless": true, "context_window": 8192}
+"""
+
+import argparse
+import inspect
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uaal_engine.logger_setup import setup_logger
+from uaal_engine.heuristic_analyzer import HeuristicAnalyzer
+from uaal_engine.session_manager import SessionManager, limits_from_env
+from uaal_engine.perception_pipeline import ANALYSIS_CACHE_SIZE, _dom_key
+from uaal_engine.command_resolver import CommandResolver
+from uaal_engine import compact_dom, macros, registry, telemetry
+from batch_runner import create_driver, needs_selector, NON_STRUCTURAL_ACTIONS
+from main import ASSISTED_ACTIONS, _create_analyzer, _execute_assisted_command, _execute_macro, _resolve_commands
+
+DEFAULT_STATE_FILE = os.path.join(os.path.expanduser("~"), ".uaal_daemon.json")
+DEFAULT_PORT = 8765
+IDLE_TIMEOUT = 1800
+
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class ClientSession:
+    """One client's drivers, last perception and the worker thread all its driver calls run on."""
+    def __init__(self, daemon):
+        self.id = uuid.uuid4().hex
+        self.daemon = daemon
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"uaal-client-{self.id[:8]}")
+        self.sessions = SessionManager(
+            lambda target: create_driver(target, daemon.headless),
+            max_sessions=daemon.max_sessions, max_memory_mb=daemon.max_memory_mb
+        )
+        self.current = None
+        self.target = None
+        self.dom = None
+        self.dom_map = None
+        self.last_used = time.monotonic()
+
+    def run(self, func, *args):
+        """Runs func on this client's driver thread and waits for the result."""
+        return self.worker.submit(func, *args).result()
+
+    def switch(self, target):
+        self.current = self.sessions.get(target)
+        self.target = target
+        self.dom = self.dom_map = None
+
+    def perceive(self, apply_limits):
+        self._require_target()
+        with telemetry.span("get_ui_dom"):
+            result = self.current.driver.get_ui_dom(
+                context_window=self.daemon.context_window, apply_limits=apply_limits
+            )
+        self.dom = result["dom"]
+        self.dom_map = compact_dom.selector_map(self.dom)
+        self.resolver.index(self.dom)
+        return result
+
+    def analyze(self, apply_limits):
+        """Analyzes the last perception (perceiving first if there is none), cached per target."""
+        self._require_target()
+        if self.dom is None:
+            self.perceive(apply_limits)
+        dom, cache = compact_dom.to_list(self.dom), self.current.analysis_cache
+        key = _dom_key(dom)
+        analyzed = cache.get(key)
+        if analyzed is None:
+            # The analyzer (and its model) is shared by every client.
+            with self.daemon.analyzer_lock, telemetry.span("analyze_dom", elements=len(dom)):
+                analyzed = self.daemon.analyzer.analyze_dom(dom)
+            if not analyzed:
+                raise RPCError(-32000, "Could not analyze the DOM.")
+            cache[key] = analyzed
+            while len(cache) > ANALYSIS_CACHE_SIZE:
+                cache.popitem(last=False)
+        return analyzed
+
+    @property
+    def resolver(self):
+        # Kept on the driver session, like the interactive loop does, so it survives switching.
+        return self.current.state.setdefault("resolver", CommandResolver(ASSISTED_ACTIONS))
+
+    def find(self, query, limit):
+        self._require_target()
+        if self.dom is None:
+            self.perceive(apply_limits=False)
+        return self.resolver.find(query, limit)
+
+    def act(self, command_str):
+        self._require_target()
+        if not command_str.split():
+            return {"action_taken": False, "rescanned": False, "command": command_str}
+        commands = macros.split(command_str) or [command_str]
+        rescanned = False
+        if any(needs_selector(command.lower().split()) for command in commands) and self.dom_map is None:
+            self.perceive(apply_limits=False)
+            rescanned = True
+        # Text-addressed targets (click "Sign in") and typos are resolved locally; no model call.
+        resolved = _resolve_commands(self.resolver, command_str, self.dom_map or {})
+        if not resolved:
+            raise RPCError(-32004, f"Could not match '{command_str}' to the current UI.")
+        command_str = resolved
+        driver, dom_map = self.current.driver, self.dom_map or {}
+        commands = macros.split(command_str) or [command_str]
+        if len(commands) > 1:
+            result = _execute_macro(commands, driver, dom_map, driver.is_web)
+        else:
+            result = _execute_assisted_command(command_str, driver, dom_map, driver.is_web)
+        # The element list survives only when every command leaves it intact.
+        structural = any(command.split()[0].lower() not in NON_STRUCTURAL_ACTIONS for command in commands)
+        if result.get('action_taken') and structural:
+            self.dom = self.dom_map = None
+        response = {"action_taken": bool(result.get('action_taken')), "rescanned": rescanned, "command": command_str}
+        if 'macro' in result:
+            response["macro"] = result['macro']
+        return response
+
+    def _require_target(self):
+        if self.current is None:
+            raise RPCError(-32002, "No target selected. Call 'switch' first.")
+
+    def close(self):
+        try:
+            self.run(self.sessions.close_all)
+        finally:
+            self.worker.shutdown(wait=False)
+
+
+def _display(dom):
+    return compact_dom.to_list(compact_dom.display(dom))
+
+
+class UAALDaemon:
+    def __init__(self, config):
+        self.config = dict(config, mode="assisted")
+        self.headless = config.get("headless", True)
+        self.context_window = config.get("context_window", 8192)
+        self.max_sessions, self.max_memory_mb = limits_from_env()
+        self.max_sessions = config.get("max_sessions", self.max_sessions)
+        self.max_memory_mb = config.get("max_session_mb", self.max_memory_mb)
+        self.token = secrets.token_hex(16)
+        self.clients = {}
+        self.clients_lock = threading.Lock()
+        self.analyzer_lock = threading.Lock()
+        logging.info("DAEMON: Loading analyzer...")
+        self.analyzer = _create_analyzer(self.config) or HeuristicAnalyzer()
+        self.methods = {
+            "open_session": self.open_session, "close_session": self.close_session,
+            "switch": self.switch, "perceive": self.perceive, "act": self.act,
+            "analyze": self.analyze, "find": self.find, "status": self.status,
+        }
+
+    def dispatch(self, method, params):
+        handler = self.methods.get(method)
+        if handler is None:
+            raise RPCError(-32601, f"Method not found: {method}")
+        if not isinstance(params, dict):
+            raise RPCError(-32602, "Params must be an object.")
+        try:
+            inspect.signature(handler).bind(**params)
+        except TypeError as e:
+            raise RPCError(-32602, f"Invalid params for '{method}': {e}")
+        self._reap_idle()
+        with telemetry.span(f"rpc.{method}"):
+            return handler(**params)
+
+    def _client(self, session):
+        with self.clients_lock:
+            client = self.clients.get(session)
+        if client is None:
+            raise RPCError(-32001, f"Unknown session '{session}'. Call 'open_session' first.")
+        client.last_used = time.monotonic()
+        return client
+
+    def _reap_idle(self):
+        now = time.monotonic()
+        with self.clients_lock:
+            idle = [c for c in self.clients.values() if now - c.last_used > IDLE_TIMEOUT]
+            for client in idle:
+                del self.clients[client.id]
+        for client in idle:
+            logging.info(f"DAEMON: Closing idle session {client.id}.")
+            client.close()
+
+    def open_session(self):
+        client = ClientSession(self)
+        with self.clients_lock:
+            self.clients[client.id] = client
+        logging.info(f"DAEMON: Opened session {client.id}.")
+        return {"session": client.id}
+
+    def close_session(self, session):
+        client = self._client(session)
+        with self.clients_lock:
+            self.clients.pop(session, None)
+        client.close()
+        logging.info(f"DAEMON: Closed session {session}.")
+        return {"closed": True}
+
+    def switch(self, session, type, identifier):
+        if type not in registry.driver_types():
+            raise RPCError(-32602, f"Invalid target type. Must be one of: {', '.join(registry.driver_types())}.")
+        client = self._client(session)
+        target = {"type": type, "identifier": identifier}
+        client.run(client.switch, target)
+        return {"target": target}
+
+    def perceive(self, session, apply_limits=False):
+        client = self._client(session)
+        result = client.run(client.perceive, apply_limits)
+        return {"dom": _display(result["dom"]), "captcha_detected": result.get("captcha_detected", False)}
+
+    def act(self, session, command):
+        client = self._client(session)
+        return client.run(client.act, command)
+
+    def find(self, session, query, limit=10):
+        client = self._client(session)
+        matches = client.run(client.find, query, limit)
+        return {"matches": [dict(_display([item])[0], score=score) for score, item in matches]}
+
+    def analyze(self, session):
+        client = self._client(session)
+        # On the client's driver thread, so a concurrent act cannot drop the DOM halfway through.
+        analyzed = client.run(client.analyze, self.config.get("assisted_type") == "analyzed")
+        return {"dom": _display(analyzed)}
+
+    def status(self):
+        with self.clients_lock:
+            clients = list(self.clients.values())
+        return {
+            "clients": len(clients),
+            "targets": [list(key) for client in clients for key in client.sessions.sessions],
+            "analyzer": type(self.analyzer).__name__,
+        }
+
+    def close(self):
+        with self.clients_lock:
+            clients, self.clients = list(self.clients.values()), {}
+        for client in clients:
+            client.close()
+
+
+def make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not secrets.compare_digest(self.headers.get("Authorization", ""), f"Bearer {daemon.token}"):
+                return self._send(401, {"jsonrpc": "2.0", "id": None,
+                                        "error": {"code": -32003, "message": "Missing or invalid token."}})
+            request_id = None
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                request_id = request.get("id")
+                result = daemon.dispatch(request.get("method"), request.get("params") or {})
+                response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+            except json.JSONDecodeError as e:
+                response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}}
+            except RPCError as e:
+                response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": e.code, "message": e.message}}
+            except Exception as e:
+                logging.error(f"DAEMON: Request failed: {e}")
+                response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32000, "message": str(e)}}
+            self._send(200, response)
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def write_state_file(path, port, token):
+    """Publishes the port and token for clients; readable by the current user only."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    if hasattr(os, 'fchmod'):
+        # The mode above only applies to a new file; an existing one may be readable by others.
+        os.fchmod(fd, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({"url": f"http://127.0.0.1:{port}/", "token": token, "pid": os.getpid()}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run UAAL as a resident JSON-RPC daemon.")
+    parser.add_argument("--config", help="JSON file with model and driver settings (default: heuristic only).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port on 127.0.0.1 (0 picks a free one).")
+    parser.add_argument("--state-file", default=DEFAULT_STATE_FILE, help="Where to publish the URL and token.")
+    args = parser.parse_args()
+
+    setup_logger()
+    telemetry.enable_from_env()
+    registry.load_plugins()
+    config = {}
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+    daemon = UAALDaemon(config)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(daemon))
+    server.daemon_threads = True
+    port = server.server_address[1]
+    write_state_file(args.state_file, port, daemon.token)
+    logging.info(f"DAEMON: Listening on http://127.0.0.1:{port}/ (token in '{args.state_file}').")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
+        if os.path.exists(args.state_file):
+            os.remove(args.state_file)
+        logging.info("DAEMON: Stopped.")
+
+
+if __name__ == "__main__":
+    main()
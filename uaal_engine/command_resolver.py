@@ -0,0 +1,152 @@
+# uaal_engine/command_resolver.py
+
+import logging
+import re
+from collections import OrderedDict
+from uaal_engine.dom_index import DomIndex, edit_distance
+
+SELECTOR_PATTERN = re.compile(r"^[a-z]\d+$")
+# Page text the browser driver lists for reading; clicks and typing go to controls when one matches.
+CONTENT_TAGS = {"h1", "h2", "h3", "p", "li", "span"}
+QUOTED_TARGET = re.compile(r"^([\"'])(.+?)\1\s*(.*)$")
+
+
+class CommandResolver:
+    """
+    Corrects mistyped assisted-mode commands locally before anything is sent
+    to a model. Actions are matched by edit distance, element targets by
+    selector edit distance or a search of the element index.
+    """
+    def __init__(self, valid_actions, min_confidence=0.75, max_memo_doms=32):
+        self.valid_actions = list(valid_actions)
+        self.min_confidence = min_confidence
+        self.max_memo_doms = max_memo_doms
+        self.selectors = set()
+        self.dom_index = DomIndex()
+        self.memo = OrderedDict()
+
+    def index(self, dom_list):
+        """Updates the element index for a newly perceived DOM; the index re-indexes only changed elements."""
+        self.dom_index.update(dom_list)
+        self.selectors = set(self.dom_index.entries)
+
+    def find(self, query, limit=10):
+        """Ranked (score, element) matches for free text."""
+        return self.dom_index.search(query, limit)
+
+    def is_well_formed(self, parts, dom_map):
+        """True when a command already names a known action and, if needed, a known selector."""
+        if not parts or parts[0] not in self.valid_actions:
+            return False
+        if parts[0] == "click":
+            return len(parts) == 2 and parts[1] in dom_map
+        if parts[0] == "type" and len(parts) > 1 and parts[1][0] in "\"'":
+            return False
+        if parts[0] == "type" and len(parts) > 2 and SELECTOR_PATTERN.match(parts[1]):
+            return parts[1] in dom_map
+        return True
+
+    def resolve(self, command_str, fallback=None):
+        """
+        Returns a corrected command string, or None. Inputs the local matcher
+        is not confident about are passed to fallback(command_str) when given.
+        Results are memoized per indexed DOM (DomIndex.key).
+        """
+        dom_key = self.dom_index.key
+        memo_for_dom = self.memo.get(dom_key)
+        if memo_for_dom is None:
+            memo_for_dom = self.memo[dom_key] = {}
+            while len(self.memo) > self.max_memo_doms:
+                self.memo.popitem(last=False)
+        else:
+            self.memo.move_to_end(dom_key)
+
+        key = command_str.strip().lower()
+        if key in memo_for_dom:
+            return memo_for_dom[key]
+
+        resolved, confidence = self._resolve_locally(key)
+        if resolved and confidence >= self.min_confidence:
+            logging.info(f"Resolved '{command_str}' -> '{resolved}' locally (confidence {confidence:.2f}).")
+        elif fallback:
+            resolved = fallback(command_str)
+            if not resolved or resolved.strip().lower() == "unknown":
+                resolved = None
+        else:
+            resolved = None
+
+        memo_for_dom[key] = resolved
+        return resolved
+
+    def _resolve_locally(self, command_str):
+        parts = command_str.split()
+        if not parts:
+            return None, 0.0
+        action, action_confidence = self._match_action(parts[0])
+        if not action:
+            return None, 0.0
+        arguments = parts[1:]
+
+        if action == "click":
+            if not arguments:
+                return None, 0.0
+            selector, target_confidence = self._match_target(arguments)
+            if not selector:
+                return None, 0.0
+            return f"click {selector}", min(action_confidence, target_confidence)
+
+        if action == "type" and arguments and arguments[0][0] in "\"'":
+            # type "Email" someone@example.com addresses the field by its text.
+            quoted = QUOTED_TARGET.match(" ".join(arguments))
+            if quoted:
+                selector, target_confidence = self._match_text(quoted.group(2))
+                if not selector:
+                    return None, 0.0
+                return f"type {selector} {quoted.group(3)}".strip(), min(action_confidence, target_confidence)
+
+        if action == "type" and arguments and SELECTOR_PATTERN.match(arguments[0]) \
+                and arguments[0] not in self.selectors:
+            selector, target_confidence = self._match_selector(arguments[0])
+            if selector:
+                return " ".join(["type", selector] + arguments[1:]), min(action_confidence, target_confidence)
+
+        return " ".join([action] + arguments), action_confidence
+
+    def _match_action(self, word):
+        if word in self.valid_actions:
+            return word, 1.0
+        best, best_distance = None, None
+        for action in self.valid_actions:
+            distance = edit_distance(word, action, limit=2)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = action, distance
+        allowed = 1 if len(word) <= 4 else 2
+        if best is None or best_distance > allowed:
+            return None, 0.0
+        return best, 1.0 - best_distance / max(len(word), len(best), 1) / 2
+
+    def _match_selector(self, word):
+        if word in self.selectors:
+            return word, 1.0
+        candidates = [s for s in self.selectors if edit_distance(word, s, limit=1) == 1]
+        if len(candidates) == 1:
+            return candidates[0], 0.8
+        return None, 0.0
+
+    def _match_target(self, arguments):
+        if len(arguments) == 1 and SELECTOR_PATTERN.match(arguments[0]):
+            selector, confidence = self._match_selector(arguments[0])
+            if selector:
+                return selector, confidence
+        return self._match_text(" ".join(arguments).strip('"\''))
+
+    def _match_text(self, query):
+        ranked = self.dom_index.search(query, limit=10)
+        ranked = [match for match in ranked if match[1].get("tag") not in CONTENT_TAGS] or ranked
+        if not ranked:
+            return None, 0.0
+        best_score, best_item = ranked[0]
+        if len(ranked) > 1 and best_score < 1.0 and ranked[1][0] == best_score:
+            # Two elements match equally well; let the model decide.
+            return best_item["short_selector"], best_score / 2
+        return best_item["short_selector"], best_score
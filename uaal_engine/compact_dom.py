@@ -0,0 +1,183 @@
+# uaal_engine/compact_dom.py
+
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+FIELDS = ("tag", "text", "short_selector", "internal_selector")
+DISPLAY_FIELDS = FIELDS[:3]
+
+
+class SelectorTree:
+    """
+    Internal selectors stored as a prefix tree: each node is one path segment
+    plus the index of its parent node (-1 for a root). Elements under the
+    same ancestors share those ancestors' nodes, so a long CSS path costs one
+    node per element instead of a full string. Paths are joined on demand.
+    """
+    SEPARATOR = " > "
+
+    def __init__(self):
+        self.parents = array('i')
+        self.segments = []
+
+    def add(self, parent, segment):
+        self.parents.append(parent)
+        self.segments.append(segment)
+        return len(self.segments) - 1
+
+    def path(self, node):
+        if node < 0:
+            return None
+        segments = []
+        while node >= 0:
+            segments.append(self.segments[node])
+            node = self.parents[node]
+        return self.SEPARATOR.join(reversed(segments))
+
+
+class Element(Mapping):
+    """Read-only dict view of one element of a CompactDom."""
+    __slots__ = ("dom", "index")
+
+    def __init__(self, dom, index):
+        self.dom = dom
+        self.index = index
+
+    def __getitem__(self, key):
+        column = self.dom.columns.get(key)
+        if column is not None:
+            return column[self.index]
+        if key == "internal_selector" and not self.dom.hide_selectors:
+            return self.dom.selector(self.index)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        # Renderers and indexes call get() per field; skip Mapping.get's exception path.
+        column = self.dom.columns.get(key)
+        if column is not None:
+            return column[self.index]
+        if key == "internal_selector" and not self.dom.hide_selectors:
+            return self.dom.selector(self.index)
+        return default
+
+    def __iter__(self):
+        return iter(self.dom.fields)
+
+    def __len__(self):
+        return len(self.dom.fields)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class CompactDom(Sequence):
+    """
+    Perceived DOM kept as columns (tag, text, short selector) plus a
+    SelectorTree node per element, instead of a dict per element. Tags are
+    interned. Indexing and iteration yield Element views, which behave like
+    the read-only dicts callers used before; to_list() materializes plain
+    dicts where JSON is needed (analyzers, recordings, the daemon).
+    """
+    def __init__(self, tree=None, columns=None, nodes=None, hide_selectors=False):
+        self.tree = tree if tree is not None else SelectorTree()
+        self.columns = columns if columns is not None else {field: [] for field in DISPLAY_FIELDS}
+        self.nodes = nodes if nodes is not None else array('i')
+        self.hide_selectors = hide_selectors
+        self.fields = DISPLAY_FIELDS if hide_selectors else FIELDS
+
+    def append(self, tag, text, short_selector, node=-1):
+        self.columns["tag"].append(sys.intern(tag))
+        self.columns["text"].append(text)
+        self.columns["short_selector"].append(short_selector)
+        self.nodes.append(node)
+
+    def selector(self, index):
+        return self.tree.path(self.nodes[index])
+
+    def selector_map(self):
+        """short_selector -> internal_selector, with paths joined only when looked up."""
+        return SelectorMap(self)
+
+    def display(self):
+        """A view over the same columns without internal selectors, as shown to users and models."""
+        return CompactDom(self.tree, self.columns, self.nodes, hide_selectors=True)
+
+    def to_list(self):
+        return [dict(element) for element in self]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Element(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CompactDom index out of range")
+        return Element(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.nodes)):
+            yield Element(self, index)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __eq__(self, other):
+        if not isinstance(other, (CompactDom, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"CompactDom({len(self)} elements)"
+
+
+class SelectorMap(Mapping):
+    __slots__ = ("dom", "positions")
+
+    def __init__(self, dom):
+        self.dom = dom
+        self.positions = {selector: i for i, selector in enumerate(dom.columns["short_selector"])}
+
+    def __getitem__(self, short_selector):
+        return self.dom.selector(self.positions[short_selector])
+
+    def __contains__(self, short_selector):
+        return short_selector in self.positions
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+
+def selector_map(dom_list):
+    """short_selector -> internal_selector for a CompactDom or a plain list (replays, tests)."""
+    if isinstance(dom_list, CompactDom):
+        return dom_list.selector_map()
+    return {item["short_selector"]: item.get("internal_selector") for item in dom_list}
+
+
+def display(dom_list):
+    """The DOM without internal selectors."""
+    if isinstance(dom_list, CompactDom):
+        return dom_list.display()
+    return [{k: v for k, v in item.items() if k != 'internal_selector'} for item in dom_list]
+
+
+def to_list(dom_list):
+    """Plain dicts, for JSON and for analyzers."""
+    if isinstance(dom_list, CompactDom):
+        return dom_list.to_list()
+    return dom_list
+
+
+def json_default(obj):
+    """json.dumps default= hook that serializes CompactDoms and their elements."""
+    if isinstance(obj, CompactDom):
+        return obj.to_list()
+    if isinstance(obj, Element):
+        return dict(obj)
+    return str(obj)
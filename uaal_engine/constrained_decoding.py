@@ -0,0 +1,314 @@
+# uaal_engine/constrained_decoding.py
+
+import logging
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+WHITESPACE = " \t\n\r"
+DIGITS = "0123456789"
+LITERALS = {"t": "rue", "f": "alse", "n": "ull"}
+
+
+class JsonArrayState:
+    """
+    Character-level pushdown automaton for the analyzer's output schema: a
+    single top-level JSON array whose elements are objects. feed() returns
+    False for any character that cannot extend a valid prefix.
+    """
+    MAX_DEPTH = 8
+
+    def __init__(self):
+        self.mode = "start"
+        self.stack = []
+        self.extra = None
+
+    def copy(self):
+        clone = JsonArrayState()
+        clone.mode = self.mode
+        clone.stack = list(self.stack)
+        clone.extra = self.extra
+        return clone
+
+    def key(self):
+        return (self.mode, tuple(self.stack), self.extra)
+
+    @property
+    def done(self):
+        return self.mode == "done"
+
+    def feed_text(self, text):
+        for ch in text:
+            if not self.feed(ch):
+                return False
+        return True
+
+    def feed(self, ch):
+        mode = self.mode
+        if mode == "string":
+            if ch == '"':
+                is_key = self.extra
+                self.extra = None
+                self.mode = "obj_colon" if is_key else self._after_value()
+            elif ch == "\\":
+                self.mode, self.extra = "string_esc", (self.extra, 0)
+            elif ch < " ":
+                return False
+            return True
+        if mode == "string_esc":
+            is_key, _ = self.extra
+            if ch == "u":
+                self.mode, self.extra = "string_hex", (is_key, 0)
+                return True
+            if ch in '"\\/bfnrt':
+                self.mode, self.extra = "string", is_key
+                return True
+            return False
+        if mode == "string_hex":
+            is_key, count = self.extra
+            if ch not in "0123456789abcdefABCDEF":
+                return False
+            if count == 3:
+                self.mode, self.extra = "string", is_key
+            else:
+                self.extra = (is_key, count + 1)
+            return True
+        if mode == "literal":
+            remaining = self.extra
+            if ch != remaining[0]:
+                return False
+            if len(remaining) == 1:
+                self.mode, self.extra = self._after_value(), None
+            else:
+                self.extra = remaining[1:]
+            return True
+        if mode == "number":
+            if self._feed_number(ch):
+                return True
+            if self.extra not in ("int", "zero", "frac", "exp"):
+                return False
+            self.mode, self.extra = self._after_value(), None
+            return self.feed(ch)
+
+        if ch in WHITESPACE:
+            return mode != "done"
+
+        if mode == "start":
+            if ch != "[":
+                return False
+            self.stack.append("top")
+            self.mode = "arr_first"
+            return True
+        if mode in ("arr_first", "arr_value"):
+            if ch == "]" and mode == "arr_first":
+                return self._close("]")
+            return self._start_value(ch)
+        if mode == "arr_next":
+            if ch == ",":
+                self.mode = "arr_value"
+                return True
+            return ch == "]" and self._close("]")
+        if mode in ("obj_first", "obj_key"):
+            if ch == "}" and mode == "obj_first":
+                return self._close("}")
+            if ch == '"':
+                self.mode, self.extra = "string", True
+                return True
+            return False
+        if mode == "obj_colon":
+            if ch == ":":
+                self.mode = "obj_value"
+                return True
+            return False
+        if mode == "obj_value":
+            return self._start_value(ch)
+        if mode == "obj_next":
+            if ch == ",":
+                self.mode = "obj_key"
+                return True
+            return ch == "}" and self._close("}")
+        return False
+
+    def _after_value(self):
+        return "obj_next" if self.stack[-1] == "obj" else "arr_next"
+
+    def _start_value(self, ch):
+        if self.stack[-1] == "top":
+            # Elements of the top-level array must be objects.
+            if ch != "{":
+                return False
+        if ch in "{[":
+            if len(self.stack) >= self.MAX_DEPTH:
+                return False
+            self.stack.append("obj" if ch == "{" else "arr")
+            self.mode = "obj_first" if ch == "{" else "arr_first"
+            return True
+        if ch == '"':
+            self.mode, self.extra = "string", False
+            return True
+        if ch in LITERALS:
+            self.mode, self.extra = "literal", LITERALS[ch]
+            return True
+        if ch == "-" or ch in DIGITS:
+            self.mode = "number"
+            self.extra = "sign" if ch == "-" else ("zero" if ch == "0" else "int")
+            return True
+        return False
+
+    def _close(self, ch):
+        top = self.stack[-1]
+        if (ch == "}") != (top == "obj"):
+            return False
+        self.stack.pop()
+        if not self.stack:
+            self.mode = "done"
+        else:
+            self.mode = self._after_value()
+        return True
+
+    def _feed_number(self, ch):
+        part = self.extra
+        if ch in DIGITS:
+            if part == "sign":
+                self.extra = "zero" if ch == "0" else "int"
+            elif part == "zero":
+                return False
+            elif part in ("frac_start", "frac"):
+                self.extra = "frac"
+            elif part in ("exp_start", "exp_sign", "exp"):
+                self.extra = "exp"
+            return True
+        if ch == "." and part in ("zero", "int"):
+            self.extra = "frac_start"
+            return True
+        if ch in "eE" and part in ("zero", "int", "frac"):
+            self.extra = "exp_start"
+            return True
+        if ch in "+-" and part == "exp_start":
+            self.extra = "exp_sign"
+            return True
+        return False
+
+
+class JsonTokenIndex:
+    """
+    Vocabulary-side data for constrained decoding. Decodes every token once
+    and caches the allowed-token mask for each automaton state, so repeated
+    states (most of a generation is spent inside strings) cost one lookup.
+    """
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.eos_token_id = tokenizer.eos_token_id
+        self.token_strings = self._decode_vocabulary(tokenizer)
+        self.by_first_char = {}
+        for token_id, text in enumerate(self.token_strings):
+            if text:
+                self.by_first_char.setdefault(text[0], []).append(token_id)
+        self._mask_cache = {}
+
+    def text_for(self, token_id):
+        if 0 <= token_id < len(self.token_strings):
+            return self.token_strings[token_id]
+        return ""
+
+    @staticmethod
+    def _decode_vocabulary(tokenizer):
+        special_ids = set(tokenizer.all_special_ids)
+        vocab_size = len(tokenizer)
+        tokens = tokenizer.convert_ids_to_tokens(list(range(vocab_size)))
+        strings = []
+        for token_id, token in enumerate(tokens):
+            if token is None or token_id in special_ids:
+                strings.append("")
+                continue
+            try:
+                # Prefixing a plain character keeps the leading space that
+                # sentencepiece and byte-level BPE encode in the token itself.
+                text = tokenizer.convert_tokens_to_string(["a", token])[1:]
+            except Exception:
+                text = ""
+            strings.append("" if "�" in text else text)
+        return strings
+
+    def allowed_mask(self, state, scores):
+        vocab_size, device = scores.shape[-1], scores.device
+        cache_key = (state.key(), vocab_size, str(device), scores.dtype)
+        mask = self._mask_cache.get(cache_key)
+        if mask is not None:
+            return mask
+
+        allowed = []
+        if state.done:
+            if self.eos_token_id is not None:
+                allowed.append(self.eos_token_id)
+        else:
+            for first_char, token_ids in self.by_first_char.items():
+                if not state.copy().feed(first_char):
+                    continue
+                for token_id in token_ids:
+                    if state.copy().feed_text(self.token_strings[token_id]):
+                        allowed.append(token_id)
+
+        mask = torch.full((vocab_size,), float("-inf"), dtype=scores.dtype, device=device)
+        allowed = [token_id for token_id in allowed if token_id < vocab_size]
+        if allowed:
+            mask[torch.tensor(allowed, device=device)] = 0.0
+        self._mask_cache[cache_key] = mask
+        return mask
+
+
+class JsonArrayLogitsProcessor(LogitsProcessor):
+    """
+    Masks every token that would take the output outside the schema. State is
+    re-synchronised from the generated token ids on every call, so rollbacks
+    during assisted (speculative) generation are handled. Calls whose vocabulary
+    size differs from the target model's (a draft with its own tokenizer) pass
+    through unconstrained; the target's verification step still enforces the schema.
+    """
+    def __init__(self, token_index, vocab_size=None):
+        self.token_index = token_index
+        self.vocab_size = vocab_size
+        self.prompt_length = None
+        self.tracks = {}
+        self.generated_tokens = 0
+
+    def state_for(self, row, input_ids):
+        """Returns the automaton state after the generated part of input_ids[row]."""
+        generated = input_ids[row, self.prompt_length:].tolist()
+        tokens, states = self.tracks.setdefault(row, ([], [JsonArrayState()]))
+        # Greedy and assisted decoding only ever replace a suffix, so scan back
+        # from the end for the last position both sequences agree on.
+        common = min(len(tokens), len(generated))
+        while common > 0 and tokens[common - 1] != generated[common - 1]:
+            common -= 1
+        del tokens[common:]
+        del states[common + 1:]
+        for token_id in generated[common:]:
+            state = states[-1].copy()
+            if not state.done and not state.feed_text(self.token_index.text_for(token_id)):
+                logging.warning("Constrained decoding accepted an out-of-schema token.")
+            tokens.append(token_id)
+            states.append(state)
+        self.generated_tokens = max(self.generated_tokens, len(generated))
+        return states[-1]
+
+    def __call__(self, input_ids, scores):
+        if self.vocab_size is not None and scores.shape[-1] != self.vocab_size:
+            return scores
+        if self.prompt_length is None:
+            self.prompt_length = input_ids.shape[1]
+        for row in range(input_ids.shape[0]):
+            state = self.state_for(row, input_ids)
+            scores[row] = scores[row] + self.token_index.allowed_mask(state, scores)
+        return scores
+
+
+class JsonArrayStoppingCriteria(StoppingCriteria):
+    """Stops generation as soon as the top-level array has been closed."""
+    def __init__(self, processor):
+        self.processor = processor
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.processor.prompt_length is None:
+            return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        finished = [self.processor.state_for(row, input_ids).done for row in range(input_ids.shape[0])]
+        return torch.tensor(finished, dtype=torch.bool, device=input_ids.device)
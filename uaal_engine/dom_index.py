@@ -0,0 +1,191 @@
+# uaal_engine/dom_index.py
+
+import heapq
+import math
+import re
+import sys
+
+WORD_PATTERN = re.compile(r"\w+")
+INDEXED_FIELDS = ("text", "placeholder", "aria_label", "summary")
+MAX_CANDIDATES = 200
+FUZZY_CHECKS = 200
+
+
+def edit_distance(a, b, limit=None):
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions)."""
+    if a == b: return 0
+    if abs(len(a) - len(b)) > (limit if limit is not None else len(a) + len(b)):
+        return abs(len(a) - len(b))
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous_previous and i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def trigrams(text):
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def words(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+class _Entry:
+    __slots__ = ("item", "signature", "label", "words", "position")
+
+    def __init__(self, item, signature):
+        self.item = item
+        self.signature = signature
+        self.position = 0
+        self.label = " ".join(item.get(field).strip() for field in INDEXED_FIELDS if item.get(field)).lower()
+        # A tuple of interned words is far smaller than a set per element, and shares storage with the postings.
+        unique = set(words(self.label))
+        if item.get("tag"):
+            unique.add(item["tag"].lower())
+        self.words = tuple(sys.intern(word) for word in unique)
+
+
+class DomIndex:
+    """
+    Search index over element text, placeholder, label, summary and tag.
+    An inverted index maps each word to the elements containing it, and a
+    trigram index over the vocabulary maps query words with typos or
+    missing endings to known words. update() only re-indexes elements whose
+    fields changed since the last perception. search() ranks elements by
+    how many query words they contain, weighting rare words higher; an
+    exact label match always ranks first and ties keep page order.
+    """
+    def __init__(self):
+        self.entries = {}
+        # Identifies the indexed content (every element's fields, in page order); changes whenever update() changes anything.
+        self.key = None
+        self.word_postings = {}
+        self.gram_postings = {}
+
+    @staticmethod
+    def _signature(item):
+        return (item.get("tag"),) + tuple(item.get(field) for field in INDEXED_FIELDS)
+
+    def update(self, dom_list):
+        """Brings the index in line with dom_list. Returns the number of elements (re)indexed."""
+        current = {item["short_selector"]: item for item in dom_list if item.get("short_selector")}
+        for selector in [s for s in self.entries if s not in current]:
+            self._remove(selector)
+        changed = 0
+        signatures = []
+        for position, (selector, item) in enumerate(current.items()):
+            signature = self._signature(item)
+            signatures.append((selector, signature))
+            entry = self.entries.get(selector)
+            if entry is None or entry.signature != signature:
+                if entry is not None:
+                    self._remove(selector)
+                entry = _Entry(item, signature)
+                self._add(selector, entry)
+                changed += 1
+            entry.item = item
+            entry.position = position
+        self.key = hash(tuple(signatures))
+        return changed
+
+    def _add(self, selector, entry):
+        self.entries[selector] = entry
+        for word in entry.words:
+            postings = self.word_postings.get(word)
+            if postings is None:
+                postings = self.word_postings[word] = set()
+                for gram in trigrams(word):
+                    self.gram_postings.setdefault(gram, set()).add(word)
+            postings.add(selector)
+
+    def _remove(self, selector):
+        entry = self.entries.pop(selector)
+        for word in entry.words:
+            postings = self.word_postings[word]
+            postings.discard(selector)
+            if not postings:
+                del self.word_postings[word]
+                for gram in trigrams(word):
+                    self.gram_postings[gram].discard(word)
+                    if not self.gram_postings[gram]:
+                        del self.gram_postings[gram]
+
+    def _expand(self, query_word):
+        """Known words close to query_word, as {word: similarity}."""
+        if query_word in self.word_postings:
+            return {query_word: 1.0}
+        grams = trigrams(query_word)
+        shared = {}
+        for gram in grams:
+            for word in self.gram_postings.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        matches = {}
+        for word, count in heapq.nlargest(FUZZY_CHECKS, shared.items(), key=lambda pair: pair[1]):
+            similarity = 2.0 * count / (len(grams) + len(word) + 2)
+            if len(query_word) >= 3 and word.startswith(query_word):
+                similarity = max(similarity, 0.5 + 0.5 * len(query_word) / len(word))
+            elif len(query_word) >= 4 and word[0] == query_word[0] and edit_distance(query_word, word, limit=1) == 1:
+                similarity = max(similarity, 0.8)
+            if similarity >= 0.5:
+                matches[word] = similarity
+        return matches
+
+    def search(self, query, limit=10):
+        """Returns up to limit (score, item) pairs, best first. Scores are in 0..1; 1.0 is an exact label match."""
+        query = query.strip().strip('"\'').lower()
+        if not query or not self.entries:
+            return []
+        total = len(self.entries)
+        terms = []
+        for query_word in dict.fromkeys(words(query)):
+            expansions = self._expand(query_word)
+            if expansions:
+                postings = [self.word_postings[word] for word in expansions]
+                selectors = postings[0] if len(postings) == 1 else set().union(*postings)
+                # Rare words say more about which element is meant.
+                terms.append((math.log(1 + total / len(selectors)), expansions, selectors))
+        if not terms:
+            return []
+
+        # Rarest terms first: once they supply enough candidates, common words
+        # only add to those candidates' scores instead of pulling in every element.
+        terms.sort(key=lambda term: len(term[2]))
+        candidates = set()
+        for position, (_, _, selectors) in enumerate(terms):
+            cap = MAX_CANDIDATES if position == 0 else limit
+            if len(candidates) >= cap:
+                break
+            for selector in selectors:
+                candidates.add(selector)
+                if len(candidates) >= cap:
+                    break
+
+        max_weight = sum(term[0] for term in terms)
+        ranked = []
+        for selector in candidates:
+            entry = self.entries[selector]
+            if entry.label == query:
+                ranked.append((1.0, -entry.position, selector))
+                continue
+            weight, matched = 0.0, 0
+            for term_weight, expansions, selectors in terms:
+                if selector in selectors:
+                    weight += term_weight * max(expansions[word] for word in entry.words if word in expansions)
+                    matched += 1
+            # Among equal matches, prefer elements with fewer unrelated words.
+            score = (weight / max_weight) * (0.8 + 0.2 * matched / max(len(entry.words), matched))
+            ranked.append((min(score, 0.99), -entry.position, selector))
+        # Equal scores keep page order.
+        best = heapq.nlargest(limit, ranked)
+        return [(round(score, 3), self.entries[selector].item) for score, _, selector in best]
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,64 @@
+# uaal_engine/element_ids.py
+
+import zlib
+
+MIN_ID_SPACE = 100
+
+
+class StableIds:
+    """
+    Assigns short selectors (tag letter + number) that survive rescans.
+    The number comes from a CRC of the element's fingerprint (structure
+    and content, supplied by the driver), not from its position, so
+    inserting or removing an element leaves every other ID alone.
+    Identical fingerprints are told apart by their order of appearance.
+    Collisions are resolved by probing, and an element keeps the ID it had
+    in the previous scan whenever that ID is still free. Each tag letter's
+    number space grows with the element count but never shrinks, so IDs
+    don't change when a page gets shorter.
+    """
+    def __init__(self):
+        self.previous = {}
+        self.spaces = {}
+
+    def _space(self, tag_char, count):
+        space = max(self.spaces.get(tag_char, MIN_ID_SPACE), MIN_ID_SPACE)
+        # At most a quarter full, so probing stays short.
+        while count * 4 > space:
+            space *= 10
+        self.spaces[tag_char] = space
+        return space
+
+    def assign(self, elements):
+        """elements: list of (tag_char, fingerprint) in page order. Returns their short selectors."""
+        counts, occurrences, keys = {}, {}, []
+        for tag_char, fingerprint in elements:
+            counts[tag_char] = counts.get(tag_char, 0) + 1
+            # Only the CRC is kept between scans, not the fingerprint itself.
+            digest = zlib.crc32(fingerprint.encode("utf-8"))
+            seen = occurrences.get((tag_char, digest), 0)
+            occurrences[(tag_char, digest)] = seen + 1
+            keys.append((tag_char, digest, seen))
+        spaces = {tag_char: self._space(tag_char, count) for tag_char, count in counts.items()}
+
+        selectors = [None] * len(keys)
+        taken = set()
+        for position, key in enumerate(keys):
+            selector = self.previous.get(key)
+            if selector is not None and selector not in taken:
+                selectors[position] = selector
+                taken.add(selector)
+        for position, (tag_char, digest, seen) in enumerate(keys):
+            if selectors[position] is not None:
+                continue
+            space = spaces[tag_char]
+            # Repeats of one fingerprint start probing from different numbers.
+            start = zlib.crc32(b"#%d" % seen, digest) if seen else digest
+            number = start % (space - 1) + 1
+            while f"{tag_char}{number}" in taken:
+                number = number % (space - 1) + 1
+            selectors[position] = f"{tag_char}{number}"
+            taken.add(selectors[position])
+
+        self.previous = dict(zip(keys, selectors))
+        return selectors
@@ -0,0 +1,156 @@
+# uaal_engine/heuristic_analyzer.py
+
+import logging
+from collections import OrderedDict
+
+CHROME_ACTIONS = {
+    "back": "GO BACK", "forward": "GO FORWARD", "refresh": "REFRESH PAGE",
+    "minimize": "MINIMIZE WINDOW", "maximize": "MAXIMIZE WINDOW", "close": "CLOSE WINDOW",
+}
+INPUT_TAGS = ["input", "textarea", "edit", "combobox"]
+BUTTON_TAGS = ["button", "menuitem"]
+TEXT_TAGS = ["p", "li", "span", "text", "listitem"]
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+INPUT_KEYWORDS = [
+    ("search", "ENTER SEARCH QUERY"), ("password", "ENTER PASSWORD"), ("email", "ENTER EMAIL"),
+    ("user", "ENTER USERNAME"), ("name", "ENTER NAME"), ("phone", "ENTER PHONE NUMBER"),
+    ("address", "ENTER ADDRESS"), ("message", "ENTER MESSAGE"), ("comment", "ENTER COMMENT"),
+]
+BUTTON_PHRASES = {
+    "sign in": "SIGN IN", "log in": "SIGN IN", "login": "SIGN IN", "sign up": "SIGN UP",
+    "register": "SIGN UP", "log out": "SIGN OUT", "sign out": "SIGN OUT", "search": "SEARCH",
+    "submit": "SUBMIT FORM", "ok": "CONFIRM", "cancel": "CANCEL", "close": "CLOSE",
+}
+ACTION_VERBS = {
+    "accept", "add", "apply", "buy", "cancel", "clear", "close", "confirm", "continue", "copy",
+    "create", "delete", "download", "edit", "find", "go", "next", "open", "previous", "print",
+    "remove", "reply", "reset", "save", "search", "send", "share", "show", "start", "stop",
+    "submit", "subscribe", "update", "upload", "view",
+}
+MAX_LABEL_WORDS = 4
+SUMMARY_LENGTH = 80
+MODEL_RESULT_CACHE_SIZE = 2000
+RESULT_KEY_FIELDS = ("short_selector", "tag", "text", "placeholder", "aria_label")
+
+
+def _shorten(text, limit=SUMMARY_LENGTH):
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class HeuristicAnalyzer:
+    """
+    Deterministic, model-free analyzer. Fills 'predicted_action' and 'summary'
+    from tag, text, placeholder and ARIA data. Used standalone, elements it
+    cannot classify get generic labels; as a first tier (tiered=True), only
+    those elements are sent to the fallback analyzer. The model's answers
+    are remembered per element (short selector plus content), so a rescan
+    only sends elements that are new or changed.
+    """
+    def __init__(self, fallback=None, tiered=True):
+        self.fallback = fallback
+        self.tiered = tiered and fallback is not None
+        self.model_results = OrderedDict()
+
+    @staticmethod
+    def _result_key(node):
+        return tuple(node.get(field) for field in RESULT_KEY_FIELDS)
+
+    def _remember(self, key, entry):
+        self.model_results[key] = entry
+        self.model_results.move_to_end(key)
+        while len(self.model_results) > MODEL_RESULT_CACHE_SIZE:
+            self.model_results.popitem(last=False)
+
+    def classify(self, item):
+        """Returns (predicted_action, summary), or None when the element is not obvious."""
+        tag = (item.get("tag") or "").lower()
+        text = (item.get("text") or "").strip()
+        label = (item.get("aria_label") or item.get("placeholder") or text).strip()
+        lowered = label.lower()
+        selector = item.get("short_selector", "")
+
+        if tag in ("browser_action", "window_action"):
+            action = CHROME_ACTIONS.get(selector)
+            return (action, text) if action else None
+
+        if tag in INPUT_TAGS:
+            for keyword, action in INPUT_KEYWORDS:
+                if keyword in lowered:
+                    return action, f"Text field for {label}"
+            return "ENTER TEXT", f"Text field for {label}" if label else "Empty text field"
+
+        if tag == "select":
+            return "SELECT OPTION", f"Drop-down list {label}".strip()
+
+        if tag in HEADING_TAGS:
+            return ("READ HEADING", f"Section heading: {_shorten(text)}") if text else None
+
+        if not label:
+            return None
+
+        if tag in BUTTON_TAGS:
+            if lowered in BUTTON_PHRASES:
+                return BUTTON_PHRASES[lowered], f"Button labeled '{label}'"
+            words = lowered.split()
+            if len(words) <= MAX_LABEL_WORDS:
+                action = label.upper() if words[0] in ACTION_VERBS else f"CLICK {label.upper()}"
+                return action, f"Button labeled '{label}'"
+            return None
+
+        if tag == "a":
+            if len(lowered.split()) <= MAX_LABEL_WORDS * 2:
+                return "OPEN LINK", f"Link to {_shorten(label)}"
+            return None
+
+        if tag in TEXT_TAGS:
+            prefix = "List item" if tag in ("li", "listitem") else "Text"
+            action = "SELECT ITEM" if tag == "listitem" else "READ TEXT"
+            return action, f"{prefix}: {_shorten(label)}"
+
+        return None
+
+    def analyze_dom(self, ui_dom):
+        analyzed, pending = [], []
+        for item in ui_dom:
+            node = dict(item)
+            classification = self.classify(node)
+            if classification:
+                node["predicted_action"], node["summary"] = classification
+            else:
+                pending.append(node)
+            analyzed.append(node)
+
+        logging.info(f"Heuristic analysis classified {len(ui_dom) - len(pending)}/{len(ui_dom)} elements.")
+        if pending and self.tiered:
+            unknown = [node for node in pending if self._result_key(node) not in self.model_results]
+            if unknown:
+                logging.info(f"Deferring {len(unknown)} unclassified elements to the model "
+                             f"({len(pending) - len(unknown)} remembered)...")
+                model_result = self.fallback.analyze_dom([dict(node) for node in unknown]) or []
+                by_selector = {
+                    entry.get("short_selector"): entry for entry in model_result if isinstance(entry, dict)
+                }
+                for node in unknown:
+                    entry = by_selector.get(node.get("short_selector"))
+                    if entry and (entry.get("predicted_action") or entry.get("summary")):
+                        self._remember(self._result_key(node), entry)
+            for node in pending:
+                entry = self.model_results.get(self._result_key(node), {})
+                if entry.get("predicted_action"): node["predicted_action"] = entry["predicted_action"]
+                if entry.get("summary"): node["summary"] = entry["summary"]
+
+        for node in pending:
+            node.setdefault("predicted_action", "INTERACT")
+            node.setdefault("summary", f"{node.get('tag', 'unknown')} element")
+        return analyzed
+
+    def interpret_command(self, command_str, valid_actions, dom_elements):
+        if self.fallback:
+            return self.fallback.interpret_command(command_str, valid_actions, dom_elements)
+        return "unknown"
+
+    def generate_plan(self, goal, ui_dom):
+        if self.fallback:
+            return self.fallback.generate_plan(goal, ui_dom)
+        logging.warning("Planning needs a model; the heuristic analyzer cannot generate plans.")
+        return None
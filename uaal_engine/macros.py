@@ -0,0 +1,73 @@
+# uaal_engine/macros.py
+
+import time
+
+SEPARATOR = ";"
+ACTIONS = ("click", "type", "press")
+
+
+def split(command_str):
+    """
+    The commands of a chained command string ('type i1 ann; click b2'), or
+    None when it is a single command. A line is only a chain when every
+    part starts with one of ACTIONS, so a ';' inside typed text or a URL
+    leaves the command whole.
+    """
+    if SEPARATOR not in command_str:
+        return None
+    commands = [command.strip() for command in command_str.split(SEPARATOR) if command.strip()]
+    if len(commands) < 2 or any(command.split()[0].lower() not in ACTIONS for command in commands):
+        return None
+    return commands
+
+
+def build_steps(commands, dom_map):
+    """
+    Turns assisted-mode commands into driver macro steps: dicts with
+    'action' and, as needed, 'target' (internal selector), 'text' or 'keys'.
+    Actions and selectors are case-insensitive; typed text is kept as entered.
+    Raises ValueError for a command that cannot be part of a macro.
+    """
+    steps = []
+    for command in commands:
+        parts = command.lower().split()
+        action = parts[0] if parts else ''
+        if action == "click":
+            if len(parts) != 2 or not dom_map.get(parts[1]):
+                raise ValueError(f"'{command}': selector not found.")
+            steps.append({"action": "click", "target": dom_map.get(parts[1])})
+        elif action == "type":
+            if len(parts) < 2:
+                raise ValueError(f"'{command}': nothing to type.")
+            selector, text = type_arguments(command, dom_map)
+            steps.append({"action": "type", "target": dom_map.get(selector) if selector else None, "text": text})
+        elif action == "press":
+            if len(parts) < 2:
+                raise ValueError(f"'{command}': no keys to press.")
+            steps.append({"action": "press", "keys": "+".join(parts[1:])})
+        else:
+            raise ValueError(f"'{action}' cannot be chained; only {', '.join(ACTIONS)} can.")
+    return steps
+
+
+def type_arguments(command, dom_map):
+    """(short selector or None, text) of a 'type' command; the text keeps its case and spacing."""
+    words = command.split(maxsplit=2)
+    if len(words) > 1 and words[1].lower() in dom_map:
+        return words[1].lower(), words[2] if len(words) > 2 else ""
+    words = command.split(maxsplit=1)
+    return None, words[1] if len(words) > 1 else ""
+
+
+def step_result(action, start, error=None, **extra):
+    result = {"action": action, "ok": error is None, "seconds": round(time.perf_counter() - start, 4), **extra}
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def summary(results, step_count, start):
+    """What run_macro returns: per-step results, how many succeeded and the total latency."""
+    completed = sum(1 for result in results if result["ok"])
+    return {"steps": results, "completed": completed, "ok": completed == step_count,
+            "seconds": round(time.perf_counter() - start, 4)}
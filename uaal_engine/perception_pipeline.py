@@ -0,0 +1,101 @@
+# uaal_engine/perception_pipeline.py
+
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from uaal_engine import compact_dom, telemetry
+
+ANALYSIS_CACHE_SIZE = 8
+
+
+def _dom_key(ui_dom):
+    return hashlib.sha1(json.dumps(ui_dom, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class PerceptionPipeline:
+    """
+    Runs the slow half of a perception turn (analysis, rendering and the DOM
+    dump to the log) on a single background worker, so the command prompt
+    stays responsive. Driver calls stay on the caller's thread: Playwright's
+    sync API and pywinauto's COM objects are bound to the thread that made them.
+    An analysis_cache (an OrderedDict, usually owned by a DriverSession)
+    lets an unchanged DOM reuse its earlier analysis.
+    """
+    def __init__(self, renderer, analyzer, assisted_type, analysis_cache=None):
+        self.renderer = renderer
+        self.analyzer = analyzer
+        self.assisted_type = assisted_type
+        self.analysis_cache = analysis_cache
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="uaal-perception")
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.current_dom = []
+
+    def submit(self, ui_dom):
+        """Publishes a freshly perceived DOM and queues its analysis and render."""
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            self.current_dom = ui_dom
+        self.executor.submit(self._process, ui_dom, generation)
+
+    def run_exclusive(self, func, *args):
+        """Runs func on the worker thread and waits, so the analyzer is never used concurrently."""
+        return self.executor.submit(func, *args).result()
+
+    def display_dom(self):
+        with self.lock:
+            dom = self.current_dom
+        return compact_dom.display(dom)
+
+    def _is_stale(self, generation):
+        return generation != self.generation
+
+    def _process(self, ui_dom, generation):
+        try:
+            current_dom = ui_dom
+            if self.assisted_type in ["analyzed", "heuristic"]:
+                if self._is_stale(generation):
+                    return
+                analyzed_dom = self._analyze(ui_dom)
+                if analyzed_dom:
+                    current_dom = analyzed_dom
+                else:
+                    logging.error("Could not analyze the DOM. Showing the raw UI data instead.")
+
+            with self.lock:
+                if self._is_stale(generation):
+                    # A newer perception landed while this one was being analyzed.
+                    return
+                self.current_dom = current_dom
+            with telemetry.span("renderer.update"):
+                self.renderer.update(current_dom)
+
+            logging.info(f"--- Current UI State ({self.assisted_type.upper()}) ---")
+            logging.info(json.dumps(self.display_dom(), indent=2, default=compact_dom.json_default))
+        except Exception as e:
+            logging.error(f"Background perception failed: {e}")
+
+    def _analyze(self, ui_dom):
+        # Analyzers send the DOM to a model as JSON; analyzed perceptions are limited, so this copy is small.
+        ui_dom = compact_dom.to_list(ui_dom)
+        if self.analysis_cache is None:
+            with telemetry.span("analyze_dom", elements=len(ui_dom)):
+                return self.analyzer.analyze_dom(ui_dom)
+        key = _dom_key(ui_dom)
+        if key in self.analysis_cache:
+            self.analysis_cache.move_to_end(key)
+            logging.info("Reusing the earlier analysis of this unchanged UI.")
+            return self.analysis_cache[key]
+        with telemetry.span("analyze_dom", elements=len(ui_dom)):
+            analyzed_dom = self.analyzer.analyze_dom(ui_dom)
+        if analyzed_dom:
+            self.analysis_cache[key] = analyzed_dom
+            while len(self.analysis_cache) > ANALYSIS_CACHE_SIZE:
+                self.analysis_cache.popitem(last=False)
+        return analyzed_dom
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,99 @@
+# uaal_engine/plan_store.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+
+PLAN_COMMANDS = ["click", "type", "press", "navigate"]
+
+
+def normalize_goal(goal):
+    """Lowercases a goal and strips punctuation and repeated whitespace."""
+    words = re.sub(r"[^\w\s:/.-]", " ", goal.lower()).split()
+    return " ".join(words)
+
+
+def dom_signature(dom_list):
+    """Hashes the structure of a DOM (tags and selectors, not text) so equivalent UIs share plans."""
+    digest = hashlib.sha1()
+    for item in dom_list:
+        digest.update(f"{item.get('tag')}|{item.get('short_selector')}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PlanStore:
+    """
+    Persists agentic-mode plans on disk, keyed by target application,
+    normalized goal and DOM structural signature, so a repeated goal on a
+    matching UI can be replayed without a model call.
+    """
+    DEFAULT_PATH = 'uaal_plans.json'
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.plans = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.plans = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"Could not load plan store '{self.path}': {e}. Starting empty.")
+
+    @staticmethod
+    def make_key(target, goal, signature):
+        return f"{target.lower()}::{normalize_goal(goal)}::{signature}"
+
+    def get(self, target, goal, signature):
+        return self.plans.get(self.make_key(target, goal, signature))
+
+    def put(self, target, goal, signature, plan):
+        self.plans[self.make_key(target, goal, signature)] = plan
+        self._save()
+
+    def discard(self, target, goal, signature):
+        if self.plans.pop(self.make_key(target, goal, signature), None) is not None:
+            self._save()
+
+    def _save(self):
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.plans, f, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logging.error(f"Failed to write plan store '{self.path}': {e}")
+
+
+def attach_expectations(plan, dom_list):
+    """
+    Filters a model plan down to well-formed steps and records the tag and
+    text each targeted element had, so a replay can verify it still matches.
+    """
+    elements = {item.get("short_selector"): item for item in dom_list}
+    steps = []
+    for step in plan or []:
+        if not isinstance(step, dict) or step.get("command") not in PLAN_COMMANDS:
+            logging.warning(f"Dropping malformed plan step: {step}")
+            continue
+        step = {k: step[k] for k in ("command", "short_selector", "text") if step.get(k) is not None}
+        element = elements.get(step.get("short_selector"))
+        if element:
+            step["expect"] = {"tag": element.get("tag"), "text": element.get("text")}
+        steps.append(step)
+    return steps
+
+
+def step_matches(step, dom_list):
+    """True when a stored step's target still exists in the live DOM with the same tag and text."""
+    selector = step.get("short_selector")
+    if step.get("command") not in ("click", "type") or not selector:
+        return True
+    for item in dom_list:
+        if item.get("short_selector") == selector:
+            expected = step.get("expect")
+            if not expected:
+                return True
+            return item.get("tag") == expected.get("tag") and item.get("text") == expected.get("text")
+    return False
@@ -0,0 +1,99 @@
+# uaal_engine/registry.py
+
+import importlib
+import logging
+import os
+from uaal_engine import telemetry
+
+
+class Backend:
+    """
+    A registered driver or analyzer. The factory is a callable or a
+    'package.module:attribute' string; strings are imported on first use,
+    so a backend's dependencies (pywinauto, Playwright, torch) are only
+    loaded when a session actually selects it.
+    """
+    def __init__(self, name, factory, description=""):
+        self.name = name
+        self.spec = factory
+        self.description = description
+        self.factory = factory if callable(factory) else None
+
+    def load(self):
+        if self.factory is None:
+            module_name, _, attribute = self.spec.partition(":")
+            try:
+                with telemetry.span("import_backend", backend=self.name):
+                    module = importlib.import_module(module_name)
+            except ImportError as e:
+                raise ImportError(f"The '{self.name}' backend needs '{module_name}', which could not be imported: {e}") from e
+            self.factory = getattr(module, attribute)
+        return self.factory
+
+
+_drivers = {}
+_analyzers = {}
+
+
+def register_driver(target_type, factory, description=""):
+    """Registers a driver for a target type. The factory is called as factory(headless=bool) and returns an unconnected driver."""
+    _drivers[target_type] = Backend(target_type, factory, description)
+
+
+def register_analyzer(source, factory, description=""):
+    """Registers an analyzer for a model source. The factory is called with the model_config 'details' dict."""
+    _analyzers[source] = Backend(source, factory, description)
+
+
+def driver_types():
+    return {name: backend.description for name, backend in _drivers.items()}
+
+
+def analyzer_sources():
+    return {name: backend.description for name, backend in _analyzers.items()}
+
+
+def load_driver(target_type):
+    """Imports a driver backend without creating it. Returns its factory."""
+    if target_type not in _drivers:
+        raise ValueError(f"Unknown target type '{target_type}'. Must be one of: {', '.join(_drivers)}.")
+    return _drivers[target_type].load()
+
+
+def load_analyzer(source):
+    """Imports an analyzer backend without creating it. Returns its factory."""
+    if source not in _analyzers:
+        raise ValueError(f"Unknown model source '{source}'. Must be one of: {', '.join(_analyzers)}.")
+    return _analyzers[source].load()
+
+
+def create_driver(target_type, headless=False):
+    return load_driver(target_type)(headless=headless)
+
+
+def create_analyzer(model_config):
+    return load_analyzer(model_config["type"])(model_config.get("details") or {})
+
+
+def load_plugins(modules=None):
+    """
+    Imports third-party backend modules, which call register_driver and
+    register_analyzer when imported. Defaults to the comma-separated
+    module names in UAAL_PLUGINS.
+    """
+    if modules is None:
+        modules = [m.strip() for m in os.environ.get("UAAL_PLUGINS", "").split(",") if m.strip()]
+    for module_name in modules:
+        try:
+            importlib.import_module(module_name)
+            logging.info(f"Loaded UAAL plugin '{module_name}'.")
+        except Exception as e:
+            logging.error(f"Could not load UAAL plugin '{module_name}': {e}")
+
+
+register_driver("desktop", "uaal_engine.windows_driver:create_driver", "Desktop application (Windows, pywinauto)")
+register_driver("web", "uaal_engine.browser_driver:create_driver", "Web page (Playwright)")
+register_analyzer("local", "uaal_engine.semantic_analyzer:create_analyzer",
+                  "Local Model (Runs on your machine, private and free)")
+register_analyzer("api", "uaal_engine.api_analyzer:create_analyzer",
+                  "API (Uses an external service like OpenAI, requires an API key)")
@@ -1,187 +1,227 @@
-# ua_al_engine/renderer.py
-
-import logging
-import subprocess
-import os
-import platform
-import time
-
-class DualTerminalRenderer:
-    """
-    Manages a separate terminal window to display the rendered UI, creating a
-    two-window experience for the user.
-    """
-    OUTPUT_FILE = 'renderer_output.txt'
-
-    def __init__(self):
-        self.renderer_process = None
-        self.os_type = platform.system().lower()
-        self._launch_renderer_window()
-
-    def _launch_renderer_window(self):
-        """Launches the display_renderer.py script in a new terminal window."""
-        logging.info("Launching separate renderer window...")
-        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        display_script_path = os.path.join(project_dir, 'display_renderer.py')
-        
-        command = ['python', display_script_path]
-        
-        try:
-            if self.os_type == "windows":
-                self.renderer_process = subprocess.Popen(
-                    ['cmd.exe', '/c', 'start'] + command,
-                    creationflags=subprocess.CREATE_NEW_CONSOLE
-                )
-            # ... (macOS and Linux logic remains the same) ...
-            
-            time.sleep(2)
-            logging.info("Renderer window launched.")
-        except Exception as e:
-            logging.error(f"Failed to launch separate terminal window: {e}")
-            self.renderer_process = None
-
-    def update(self, dom_list):
-        """Renders the UI DOM to a text file for the display window to read."""
-        # This is a public method that calls the private rendering logic
-        rendered_text = self._render_to_text(dom_list)
-        try:
-            with open(self.OUTPUT_FILE, 'w', encoding='utf-8') as f:
-                f.write(rendered_text)
-        except Exception as e:
-            logging.error(f"Failed to write to renderer output file: {e}")
-
-    def _render_to_text(self, dom_list):
-        """Takes a DOM list and returns a single formatted string."""
-        output_lines = []
-        
-        for item in dom_list:
-            tag = item.get("tag", "unknown").lower()
-            text = item.get("text", "").strip()
-            short_selector = item.get("short_selector", "")
-            command_tag = f"[{short_selector}]" if short_selector else ""
-
-            # --- RENDER HEADERS ---
-            if tag.startswith('h'):
-                output_lines.append("") # Add a blank line before the header
-                output_lines.append(f"=== {text.upper()} ===")
-                output_lines.append("") # And a blank line after
-            
-            # --- RENDER INPUT FIELDS ---
-            elif tag in ['input', 'textarea', 'edit']:
-                prompt_text = f"{text} " if text else ""
-                output_lines.append(f"{prompt_text}{command_tag} [_________________________]")
-                output_lines.append("") # Add a blank line after for spacing
-
-            # --- RENDER LIST ITEMS AND PARAGRAPHS ---
-            elif tag in ['p', 'li']:
-                output_lines.append(f"- {text} {command_tag if tag == 'li' else ''}")
-
-            # --- RENDER LINKS AND BUTTONS ---
-            elif tag in ['a', 'button', 'select']:
-                line = f"[{text}] {command_tag}" if text else command_tag
-                output_lines.append(line)
-            
-            # --- RENDER GENERIC TEXT ---
-            else:
-                if text:
-                    output_lines.append(f"{text} {command_tag}")
-
-        # Assemble the final string
-        header = "--- Rendered Text-Based UI ---\n\n"
-        footer = "\n\n------------------------------\n"
-        return header + "\n".join(output_lines) + footer
-        """Takes a DOM list and returns a single formatted string."""
-        output_lines = []
-        
-        for item in dom_list:
-            tag = item.get("tag", "unknown").lower()
-            text = item.get("text", "").strip()
-            short_selector = item.get("short_selector", "")
-            command_tag = f"[{short_selector}]" if short_selector else ""
-
-            # --- RENDER HEADERS ---
-            if tag.startswith('h'):
-                output_lines.append("") # Add a blank line before the header
-                output_lines.append(f"=== {text.upper()} ===")
-                output_lines.append("") # And a blank line after
-            
-            # --- RENDER INPUT FIELDS ---
-            elif tag in ['input', 'textarea', 'edit']:
-                prompt_text = f"{text} " if text else ""
-                output_lines.append(f"{prompt_text}{command_tag} [_________________________]")
-                output_lines.append("") # Add a blank line after for spacing
-
-            # --- RENDER LIST ITEMS AND PARAGRAPHS ---
-            elif tag in ['p', 'li']:
-                output_lines.append(f"- {text} {command_tag if tag == 'li' else ''}")
-
-            # --- RENDER LINKS AND BUTTONS ---
-            elif tag in ['a', 'button', 'select']:
-                line = f"[{text}] {command_tag}" if text else command_tag
-                output_lines.append(line)
-            
-            # --- RENDER GENERIC TEXT ---
-            else:
-                if text:
-                    output_lines.append(f"{text} {command_tag}")
-
-        # Assemble the final string
-        header = "--- Rendered Text-Based UI ---\n\n"
-        footer = "\n\n------------------------------\n"
-        return header + "\n".join(output_lines) + footer
-        """Takes a DOM list and returns a single formatted string."""
-        output_lines = []
-        current_line = ""
-        for item in dom_list:
-            tag = item.get("tag", "unknown").lower()
-            text = item.get("text", "").strip()
-            short_selector = item.get("short_selector", "")
-            command_tag = f"[{short_selector}]" if short_selector else ""
-
-            # --- NEW LOGIC FOR INPUT FIELDS ---
-            if tag in ['input', 'textarea', 'edit']:
-                if text:
-                    # Input field with existing text
-                    current_line += f" {text} [___{short_selector}___]"
-                else:
-                    # Empty input field
-                    current_line += f" [___{short_selector}___]"
-            # --- END NEW LOGIC ---
-            elif tag.startswith('h'):
-                if current_line: output_lines.append(current_line)
-                output_lines.append("")
-                output_lines.append(f"== {text} {command_tag} ==")
-                output_lines.append("")
-                current_line = ""
-            elif tag in ['a', 'button', 'select']:
-                if text: current_line += f" {text} {command_tag}"
-                else: current_line += f" {command_tag}"
-            elif tag in ['p', 'li']:
-                if current_line: output_lines.append(current_line)
-                current_line = text
-            else:
-                if text: current_line += f" {text}"
-        if current_line: output_lines.append(current_line)
-        
-        # Assemble the final string
-        header = "--- Rendered Text-Based UI ---\n\n"
-        footer = "\n\n------------------------------\n"
-        return header + "\n".join(output_lines) + footer
-
-    def close(self):
-        """Closes the separate renderer window."""
-        if self.renderer_process and self.renderer_process.poll() is None:
-            logging.info("Closing renderer window...")
-            try:
-                self.renderer_process.terminate()
-            except Exception as e:
-                logging.error(f"Could not terminate renderer process: {e}")
-        if os.path.exists(self.OUTPUT_FILE):
-            os.remove(self.OUTPUT_FILE)
-
-# This function is kept for backwards compatibility but is deprecated
-def render_dom_as_text(dom_list):
-    renderer = DualTerminalRenderer()
-    renderer.update(dom_list)
-    # Note: In this simple call, closing is not handled automatically.
-
+# ua_al_engine/renderer.py
+
+import json
+import logging
+import subprocess
+import os
+import platform
+import secrets
+import shlex
+import shutil
+import sys
+import tempfile
+import threading
+from multiprocessing.connection import Listener
+
+# The display reads the IPC key from here (or from a private key file), never from its command line.
+AUTHKEY_ENV = "UAAL_RENDERER_AUTHKEY"
+
+def diff_lines(old, new):
+    """Returns (start, deleted, inserted) such that old[start:start + deleted] = inserted gives new."""
+    start, limit = 0, min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+    return start, end_old - start, new[start:end_new]
+
+
+class DualTerminalRenderer:
+    """
+    Manages a separate terminal window to display the rendered UI, creating a
+    two-window experience for the user. Frames are pushed to the display
+    process over a local socket (a named pipe on Windows) as length-prefixed
+    messages, so each redraw is delivered whole and without polling. After
+    the first full frame, only the changed range of lines is sent.
+    """
+    HEADER_LINES = ["--- Rendered Text-Based UI ---", ""]
+    FOOTER_LINES = ["", "------------------------------", ""]
+    LINUX_TERMINALS = [
+        ("gnome-terminal", ["--"]), ("konsole", ["-e"]), ("xfce4-terminal", ["-x"]),
+        ("xterm", ["-e"]), ("x-terminal-emulator", ["-e"]),
+    ]
+
+    def __init__(self, launch_window=True):
+        self.renderer_process = None
+        self.os_type = platform.system().lower()
+        self.listener = None
+        self.connection = None
+        self.lines = []
+        self.line_cache = {}
+        self.socket_dir = None
+        self.lock = threading.Lock()
+        if launch_window:
+            self._start_listener()
+            self._launch_renderer_window()
+
+    def _start_listener(self):
+        self.authkey = secrets.token_bytes(16)
+        if self.os_type == "windows":
+            self.address = rf"\\.\pipe\uaal-renderer-{os.getpid()}-{secrets.token_hex(4)}"
+        else:
+            # A private directory keeps other users away from the socket.
+            self.socket_dir = tempfile.mkdtemp(prefix="uaal-renderer-")
+            self.address = os.path.join(self.socket_dir, "display.sock")
+        self.listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept_forever, name="uaal-renderer-ipc", daemon=True).start()
+
+    def _accept_forever(self):
+        """Accepts display connections; a reconnecting display gets the latest frame straight away."""
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                return
+            except Exception as e:
+                logging.warning(f"Rejected a renderer display connection: {e}")
+                continue
+            with self.lock:
+                if self.connection:
+                    self.connection.close()
+                self.connection = connection
+                self._send_locked({"type": "frame", "lines": self.lines})
+
+    def _display_command(self):
+        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        display_script_path = os.path.join(project_dir, 'display_renderer.py')
+        return [sys.executable, display_script_path, '--address', self.address]
+
+    def _display_env(self):
+        return dict(os.environ, **{AUTHKEY_ENV: self.authkey.hex()})
+
+    def _write_key_file(self):
+        """For launches that do not inherit our environment; the file sits in the private socket directory."""
+        path = os.path.join(self.socket_dir, "authkey")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.authkey.hex())
+        return path
+
+    def _launch_renderer_window(self):
+        """Launches the display_renderer.py script in a new terminal window."""
+        logging.info("Launching separate renderer window...")
+        command = self._display_command()
+        
+        try:
+            if self.os_type == "windows":
+                self.renderer_process = subprocess.Popen(command, creationflags=subprocess.CREATE_NEW_CONSOLE,
+                                                         env=self._display_env())
+            elif self.os_type == "darwin":
+                # Terminal runs the script in a fresh login shell, without our environment.
+                command += ['--authkey-file', self._write_key_file()]
+                script = shlex.join(command).replace('\\', '\\\\').replace('"', '\\"')
+                self.renderer_process = subprocess.Popen(
+                    ['osascript', '-e', f'tell application "Terminal" to do script "{script}"']
+                )
+            else:
+                terminal = next(((name, args) for name, args in self.LINUX_TERMINALS if shutil.which(name)), None)
+                if terminal is None:
+                    logging.warning("No terminal emulator found. Start the display manually in another terminal:")
+                    logging.warning(shlex.join(command + ['--authkey-file', self._write_key_file()]))
+                    return
+                name, args = terminal
+                self.renderer_process = subprocess.Popen([name] + args + command, env=self._display_env())
+            logging.info("Renderer window launched.")
+        except Exception as e:
+            logging.error(f"Failed to launch separate terminal window: {e}")
+            self.renderer_process = None
+
+    def update(self, dom_list):
+        """Renders the UI DOM and pushes the changed lines to the display window."""
+        lines = self._render_lines(dom_list)
+        with self.lock:
+            previous, self.lines = self.lines, lines
+            if self.connection:
+                start, deleted, inserted = diff_lines(previous, lines)
+                if deleted or inserted:
+                    self._send_locked({"type": "patch", "start": start, "delete": deleted, "insert": inserted})
+
+    def _send_locked(self, message):
+        try:
+            self.connection.send_bytes(json.dumps(message).encode('utf-8'))
+        except (OSError, EOFError, ValueError) as e:
+            logging.warning(f"Renderer display disconnected: {e}")
+            self.connection.close()
+            self.connection = None
+
+    def _render_element(self, item):
+        """Returns the lines for one element; they depend only on its tag, text and selector."""
+        tag = item.get("tag", "unknown").lower()
+        text = item.get("text", "").strip()
+        short_selector = item.get("short_selector", "")
+        command_tag = f"[{short_selector}]" if short_selector else ""
+
+        # --- RENDER HEADERS ---
+        if tag.startswith('h'):
+            return ("", f"=== {text.upper()} ===", "")
+
+        # --- RENDER INPUT FIELDS ---
+        if tag in ['input', 'textarea', 'edit']:
+            prompt_text = f"{text} " if text else ""
+            return (f"{prompt_text}{command_tag} [_________________________]", "")
+
+        # --- RENDER LIST ITEMS AND PARAGRAPHS ---
+        if tag in ['p', 'li']:
+            return (f"- {text} {command_tag if tag == 'li' else ''}",)
+
+        # --- RENDER LINKS AND BUTTONS ---
+        if tag in ['a', 'button', 'select']:
+            return (f"[{text}] {command_tag}" if text else command_tag,)
+
+        # --- RENDER GENERIC TEXT ---
+        return (f"{text} {command_tag}",) if text else ()
+
+    def _render_lines(self, dom_list):
+        """
+        Returns the full list of rendered lines. Lines are cached per element,
+        so only elements that are new or changed since the last call are
+        rendered; the cache is rebuilt from the current DOM to stay bounded.
+        """
+        previous, cache = self.line_cache, {}
+        output_lines = list(self.HEADER_LINES)
+        for item in dom_list:
+            key = (item.get("tag"), item.get("text"), item.get("short_selector"))
+            lines = previous.get(key)
+            if lines is None:
+                lines = cache.get(key) or self._render_element(item)
+            cache[key] = lines
+            output_lines.extend(lines)
+        if len(output_lines) == len(self.HEADER_LINES):
+            output_lines.append("")
+        output_lines.extend(self.FOOTER_LINES)
+        self.line_cache = cache
+        return output_lines
+
+    def _render_to_text(self, dom_list):
+        """Takes a DOM list and returns a single formatted string."""
+        return "\n".join(self._render_lines(dom_list))
+
+    def close(self):
+        """Closes the separate renderer window."""
+        with self.lock:
+            if self.connection:
+                self._send_locked({"type": "close"})
+                if self.connection:
+                    self.connection.close()
+                self.connection = None
+        if self.listener:
+            self.listener.close()
+            self.listener = None
+        if self.renderer_process and self.renderer_process.poll() is None:
+            logging.info("Closing renderer window...")
+            try:
+                self.renderer_process.terminate()
+            except Exception as e:
+                logging.error(f"Could not terminate renderer process: {e}")
+        if self.socket_dir:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+            self.socket_dir = None
+
+# This function is kept for backwards compatibility but is deprecated
+def render_dom_as_text(dom_list):
+    renderer = DualTerminalRenderer()
+    renderer.update(dom_list)
+    # Note: In this simple call, closing is not handled automatically.
+
@@ -1,81 +1,158 @@
-# uaal_engine/semantic_analyzer.py
-
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-import json
-import logging
-
-class SemanticAnalyzer:
-    def __init__(self, model_name="microsoft/Phi-3-mini-4k-instruct"):
-        logging.info(f"Initializing Semantic Analyzer with model: {model_name}.")
-        self.pipe = pipeline(
-            "text-generation",
-            model=model_name,
-            model_kwargs={"torch_dtype": "auto"},
-            device_map="auto",
-        )
-        logging.info("Model loaded successfully.")
-
-    def analyze_dom(self, ui_dom):
-        system_prompt = (
-            "You are a UI analysis machine that speaks only JSON. "
-            "Your task is to take a list of UI elements and add two new keys to each element: "
-            "'predicted_action' (a concise, uppercase verb phrase) and "
-            "'summary' (a brief description). "
-            "Your response MUST be ONLY the modified JSON object, with no extra text."
-        )
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": json.dumps(ui_dom, indent=2)}
-        ]
-        logging.info("Analyzing UI DOM with local AI model...")
-        output = self.pipe(messages, max_new_tokens=4096, eos_token_id=self.pipe.tokenizer.eos_token_id, do_sample=False)
-        response_text = output[0]['generated_text'][-1]['content']
-        try:
-            json_start = response_text.find('[')
-            json_end = response_text.rfind(']') + 1
-            return json.loads(response_text[json_start:json_end])
-        except (json.JSONDecodeError, ValueError) as e:
-            logging.error(f"Could not parse JSON from model response. Error: {e}")
-            return None
-    
-    def interpret_command(self, command_str, valid_actions, dom_elements):
-        system_prompt = (
-            "You are a helpful assistant that corrects user input for a command-line UI automation tool. "
-            "Your task is to interpret the user's intent and formulate a single, valid command to accomplish it. "
-            "Your entire response MUST be the single corrected command and nothing else. "
-            "If the user's intent is unclear or cannot be mapped to a valid action, you MUST respond with the single word: unknown"
-        )
-        user_prompt = f"""
-CONTEXT:
-- The user's raw command was: "{command_str}"
-- The list of available UI elements is: {json.dumps(dom_elements, indent=2)}
-- The list of valid command actions is: {valid_actions}
-
-TASK:
-Based on the context, what is the single, corrected command the user was trying to issue?
-
-Corrected command:"""
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
-        logging.info(f"Interpreting ambiguous command '{command_str}' with AI...")
-        try:
-            output = self.pipe(
-                messages,
-                max_new_tokens=50,
-                eos_token_id=self.pipe.tokenizer.eos_token_id,
-                do_sample=False,
-                pad_token_id=self.pipe.tokenizer.eos_token_id
-            )
-            response_text = output[0]['generated_text'][-1]['content']
-            corrected_command = response_text.strip().replace("`", "").split('\n')[0]
-            return corrected_command
-        except Exception as e:
-            logging.error(f"An error occurred during AI command interpretation: {e}")
-            return "unknown"
-
-    def generate_plan(self, goal, ui_dom):
-        logging.warning("generate_plan is not fully implemented yet.")
-        return None
\ No newline at end of file
+# uaal_engine/semantic_analyzer.py
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline, LogitsProcessorList, StoppingCriteriaList
+import json
+import logging
+from uaal_engine.constrained_decoding import JsonTokenIndex, JsonArrayLogitsProcessor, JsonArrayStoppingCriteria
+
+class SemanticAnalyzer:
+    def __init__(self, model_name="microsoft/Phi-3-mini-4k-instruct", draft_model_name=None):
+        logging.info(f"Initializing Semantic Analyzer with model: {model_name}.")
+        self.pipe = pipeline(
+            "text-generation",
+            model=model_name,
+            model_kwargs={"torch_dtype": "auto"},
+            device_map="auto",
+        )
+        self.draft_model = None
+        self.draft_tokenizer = None
+        self.draft_shares_vocab = True
+        if draft_model_name:
+            logging.info(f"Loading draft model for speculative decoding: {draft_model_name}.")
+            self.draft_model = AutoModelForCausalLM.from_pretrained(
+                draft_model_name, torch_dtype="auto", device_map="auto"
+            )
+            self.draft_tokenizer = AutoTokenizer.from_pretrained(draft_model_name)
+            self.draft_shares_vocab = self.draft_tokenizer.get_vocab() == self.pipe.tokenizer.get_vocab()
+            if not self.draft_shares_vocab:
+                logging.info("Draft and target tokenizers differ; using universal assisted decoding.")
+        self.json_token_index = None
+        self.last_generation_tokens = 0
+        self.last_usage = {}
+        logging.info("Model loaded successfully.")
+
+    def _json_constraints(self):
+        """Builds a fresh logits processor and stopping criteria for one JSON generation."""
+        if self.json_token_index is None:
+            logging.info("Indexing tokenizer vocabulary for constrained JSON decoding...")
+            self.json_token_index = JsonTokenIndex(self.pipe.tokenizer)
+        processor = JsonArrayLogitsProcessor(self.json_token_index, vocab_size=self.pipe.model.config.vocab_size)
+        return processor, JsonArrayStoppingCriteria(processor)
+
+    def _assisted_generation_kwargs(self):
+        """Extra generate() arguments that let the draft model propose tokens for the target to verify."""
+        if self.draft_model is None:
+            return {}
+        kwargs = {"assistant_model": self.draft_model}
+        if not self.draft_shares_vocab:
+            kwargs["tokenizer"] = self.pipe.tokenizer
+            kwargs["assistant_tokenizer"] = self.draft_tokenizer
+        return kwargs
+
+    def _record_usage(self, messages, completion_tokens):
+        """Stores OpenAI-style token counts for the last call, so benchmarks can compare both analyzers."""
+        prompt_ids = self.pipe.tokenizer.apply_chat_template(messages, add_generation_prompt=True)
+        self.last_usage = {
+            "prompt_tokens": len(prompt_ids),
+            "completion_tokens": completion_tokens,
+            "total_tokens": len(prompt_ids) + completion_tokens,
+        }
+
+    def analyze_dom(self, ui_dom):
+        system_prompt = (
+            "You are a UI analysis machine that speaks only JSON. "
+            "Your task is to take a list of UI elements and add two new keys to each element: "
+            "'predicted_action' (a concise, uppercase verb phrase) and "
+            "'summary' (a brief description). "
+            "Your response MUST be ONLY the modified JSON object, with no extra text."
+        )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": json.dumps(ui_dom, indent=2)}
+        ]
+        logging.info("Analyzing UI DOM with local AI model...")
+        return self._generate_json_array(messages)
+
+    def _generate_json_array(self, messages, max_new_tokens=4096):
+        processor, stopping = self._json_constraints()
+        output = self.pipe(
+            messages,
+            max_new_tokens=max_new_tokens,
+            eos_token_id=self.pipe.tokenizer.eos_token_id,
+            do_sample=False,
+            logits_processor=LogitsProcessorList([processor]),
+            stopping_criteria=StoppingCriteriaList([stopping]),
+            **self._assisted_generation_kwargs(),
+        )
+        self.last_generation_tokens = processor.generated_tokens
+        self._record_usage(messages, self.last_generation_tokens)
+        logging.info(f"Constrained generation produced {self.last_generation_tokens} tokens.")
+        response_text = output[0]['generated_text'][-1]['content']
+        try:
+            json_start = response_text.find('[')
+            json_end = response_text.rfind(']') + 1
+            return json.loads(response_text[json_start:json_end])
+        except (json.JSONDecodeError, ValueError) as e:
+            logging.error(f"Could not parse JSON from model response. Error: {e}")
+            return None
+    
+    def interpret_command(self, command_str, valid_actions, dom_elements):
+        system_prompt = (
+            "You are a helpful assistant that corrects user input for a command-line UI automation tool. "
+            "Your task is to interpret the user's intent and formulate a single, valid command to accomplish it. "
+            "Your entire response MUST be the single corrected command and nothing else. "
+            "If the user's intent is unclear or cannot be mapped to a valid action, you MUST respond with the single word: unknown"
+        )
+        user_prompt = f"""
+CONTEXT:
+- The user's raw command was: "{command_str}"
+- The list of available UI elements is: {json.dumps(dom_elements, indent=2)}
+- The list of valid command actions is: {valid_actions}
+
+TASK:
+Based on the context, what is the single, corrected command the user was trying to issue?
+
+Corrected command:"""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        logging.info(f"Interpreting ambiguous command '{command_str}' with AI...")
+        try:
+            output = self.pipe(
+                messages,
+                max_new_tokens=50,
+                eos_token_id=self.pipe.tokenizer.eos_token_id,
+                do_sample=False,
+                pad_token_id=self.pipe.tokenizer.eos_token_id,
+                **self._assisted_generation_kwargs(),
+            )
+            response_text = output[0]['generated_text'][-1]['content']
+            self._record_usage(messages, len(self.pipe.tokenizer.encode(response_text, add_special_tokens=False)))
+            corrected_command = response_text.strip().replace("`", "").split('\n')[0]
+            return corrected_command
+        except Exception as e:
+            logging.error(f"An error occurred during AI command interpretation: {e}")
+            return "unknown"
+
+    def generate_plan(self, goal, ui_dom):
+        system_prompt = (
+            "You are a UI automation planner that speaks only JSON. "
+            "Given a goal and a list of UI elements, respond with a JSON array of steps that accomplishes the goal. "
+            "Each step is an object with 'command' (one of: click, type, press, navigate), "
+            "'short_selector' (the element to act on, if the command needs one) and "
+            "'text' (the text to type, keys to press or URL to open, if needed). "
+            "Your response MUST be ONLY the JSON array, with no extra text."
+        )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"GOAL: {goal}\n\nUI ELEMENTS:\n{json.dumps(ui_dom, indent=2)}"}
+        ]
+        logging.info("Generating plan with local AI model...")
+        return self._generate_json_array(messages, max_new_tokens=1024)
+
+
+def create_analyzer(details):
+    """Registry factory for a 'local' model_config."""
+    return SemanticAnalyzer(model_name=details["name"], draft_model_name=details.get("draft_model"))
@@ -0,0 +1,124 @@
+# uaal_engine/session_manager.py
+
+import logging
+import os
+import time
+from collections import OrderedDict
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_MAX_SESSIONS = 4
+
+
+def process_tree_rss_mb():
+    """Resident memory of this process and its children (browsers, helpers) in MB, or None without psutil."""
+    if psutil is None:
+        return None
+    process = psutil.Process()
+    total = 0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024)
+
+
+class DriverSession:
+    """A connected driver plus the per-target state that makes switching back cheap."""
+    def __init__(self, key, driver):
+        self.key = key
+        self.driver = driver
+        self.created = self.last_used = time.monotonic()
+        self.state = {}
+        self.analysis_cache = OrderedDict()
+
+    @property
+    def alive(self):
+        # A closed desktop window leaves the driver without a window to talk to.
+        return getattr(self.driver, 'main_window', True) is not None
+
+
+class SessionManager:
+    """
+    Keeps driver sessions alive across 'switch' commands, keyed by
+    (type, identifier), so returning to a target reuses its driver, DOM
+    cache and analysis results instead of relaunching and reconnecting.
+    Idle sessions are evicted least-recently-used first when there are
+    more than max_sessions, or when this process tree uses more than
+    max_memory_mb (needs psutil; otherwise only the count limit applies).
+    """
+    def __init__(self, create_driver, max_sessions=DEFAULT_MAX_SESSIONS, max_memory_mb=None):
+        self.create_driver = create_driver
+        self.max_sessions = max(1, max_sessions)
+        self.max_memory_mb = max_memory_mb
+        self.sessions = OrderedDict()
+        if max_memory_mb and psutil is None:
+            logging.warning("psutil is not installed; the session memory limit will not be enforced.")
+
+    @staticmethod
+    def make_key(target):
+        identifier = target["identifier"].strip()
+        # App names are case-insensitive; URLs are kept as typed.
+        return (target["type"], identifier.lower() if target["type"] == "desktop" else identifier)
+
+    def get(self, target):
+        """Returns a warm session for the target, creating and connecting one if needed."""
+        key = self.make_key(target)
+        session = self.sessions.get(key)
+        if session is not None and not session.alive:
+            self._close(key)
+            session = None
+        if session is not None:
+            logging.info(f"Resuming warm session for {target['type']} '{target['identifier']}'.")
+            self.sessions.move_to_end(key)
+        else:
+            session = DriverSession(key, self.create_driver(target))
+            self.sessions[key] = session
+        session.last_used = time.monotonic()
+        self._evict(keep=key)
+        return session
+
+    def _evict(self, keep):
+        while len(self.sessions) > self.max_sessions:
+            self._close(self._oldest(keep), reason="session limit reached")
+        if not self.max_memory_mb:
+            return
+        while len(self.sessions) > 1:
+            used = process_tree_rss_mb()
+            if used is None or used <= self.max_memory_mb:
+                break
+            self._close(self._oldest(keep), reason=f"memory {used:.0f} MB over {self.max_memory_mb} MB")
+
+    def _oldest(self, keep):
+        return next(key for key in self.sessions if key != keep)
+
+    def _close(self, key, reason=None):
+        session = self.sessions.pop(key, None)
+        if session is None:
+            return
+        if reason:
+            logging.info(f"Evicting idle session {key[0]} '{key[1]}' ({reason}).")
+        if hasattr(session.driver, 'cleanup'):
+            try:
+                session.driver.cleanup()
+            except Exception as e:
+                logging.error(f"Cleanup of session {key} failed: {e}")
+
+    def discard(self, target):
+        self._close(self.make_key(target))
+
+    def close_all(self):
+        for key in list(self.sessions):
+            self._close(key)
+        logging.info("All driver sessions have been cleaned up.")
+
+
+def limits_from_env():
+    """Reads UAAL_MAX_SESSIONS and UAAL_MAX_SESSION_MB; returns (max_sessions, max_memory_mb)."""
+    max_sessions = int(os.environ.get("UAAL_MAX_SESSIONS", DEFAULT_MAX_SESSIONS))
+    max_memory = os.environ.get("UAAL_MAX_SESSION_MB")
+    return max_sessions, (float(max_memory) if max_memory else None)
@@ -0,0 +1,158 @@
+# uaal_engine/session_recorder.py
+
+import atexit
+import gzip
+import inspect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from uaal_engine.compact_dom import json_default
+
+RECORDING_TEMPLATE = 'uaal_session_%Y%m%d_%H%M%S.jsonl.gz'
+
+
+def _open_recording(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class SessionRecorder:
+    """
+    Writes session events (perceived DOMs, analyzer calls, console input and
+    executed commands) as compact JSONL, gzipped when the path ends in .gz.
+    Serialization and I/O happen on a writer thread so the main loop never
+    waits on disk. A perceived DOM identical to the previous one is stored
+    as a reference. With path=None, events are kept in memory (`events`).
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.events = []
+        self.start = time.perf_counter()
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.last_dom = None
+        self.last_dom_seq = None
+        self.queue = queue.Queue()
+        self.writer = None
+        if path:
+            self.writer = threading.Thread(target=self._write_forever, name="uaal-recorder", daemon=True)
+            self.writer.start()
+
+    def record(self, kind, **data):
+        with self.lock:
+            self.seq += 1
+            event = {"seq": self.seq, "t": round(time.perf_counter() - self.start, 4), "kind": kind}
+            if kind == "perception":
+                if data.get("dom") is self.last_dom or data.get("dom") == self.last_dom:
+                    data = dict(data, dom=None, dom_ref=self.last_dom_seq)
+                else:
+                    self.last_dom, self.last_dom_seq = data.get("dom"), self.seq
+            event.update(data)
+            if self.writer is None:
+                self.events.append(event)
+            else:
+                self.queue.put(event)
+
+    def _write_forever(self):
+        try:
+            with _open_recording(self.path, 'w') as f:
+                while True:
+                    event = self.queue.get()
+                    if event is None:
+                        break
+                    f.write(json.dumps(event, separators=(",", ":"), default=json_default) + "\n")
+                    if self.queue.empty():
+                        f.flush()
+        except OSError as e:
+            logging.error(f"Session recording to '{self.path}' failed: {e}")
+
+    def close(self):
+        if self.writer is not None and self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join(timeout=10)
+
+
+def load_recording(path):
+    """Reads a recording back into a list of events, resolving DOM references."""
+    events, doms = [], {}
+    with _open_recording(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event.get("kind") == "perception":
+                if event.get("dom_ref") is not None:
+                    event["dom"] = doms.get(event["dom_ref"], [])
+                else:
+                    doms[event["seq"]] = event.get("dom")
+            events.append(event)
+    return events
+
+
+class RecordingAnalyzer:
+    """Wraps an analyzer and records each request and response with its duration."""
+    METHODS = ["analyze_dom", "interpret_command", "generate_plan"]
+
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+
+    def __getattr__(self, name):
+        attribute = getattr(self.analyzer, name)
+        if name not in self.METHODS:
+            return attribute
+
+        def recorded(*args, **kwargs):
+            start = time.perf_counter()
+            response = attribute(*args, **kwargs)
+            record("analyzer", method=name, request=_request(attribute, args, kwargs), response=response,
+                   seconds=round(time.perf_counter() - start, 4))
+            return response
+        return recorded
+
+
+def _request(method, args, kwargs):
+    """A call's arguments in parameter order, so keyword and positional calls record (and replay) alike."""
+    if not kwargs:
+        return list(args)
+    try:
+        return list(inspect.signature(method).bind(*args, **kwargs).arguments.values())
+    except (TypeError, ValueError):
+        return list(args) + [kwargs]
+
+
+_recorder = None
+
+
+def enable(path=None):
+    global _recorder
+    if _recorder is None:
+        _recorder = SessionRecorder(path)
+        atexit.register(_recorder.close)
+        if path:
+            logging.info(f"Session recording enabled. Writing events to '{path}'.")
+    return _recorder
+
+
+def enable_from_env():
+    """Enables recording when UAAL_RECORD is set ('1' for a timestamped file, otherwise a path)."""
+    value = os.environ.get("UAAL_RECORD")
+    if value:
+        enable(time.strftime(RECORDING_TEMPLATE) if value == "1" else value)
+
+
+def is_enabled():
+    return _recorder is not None
+
+
+def record(kind, **data):
+    if _recorder is not None:
+        _recorder.record(kind, **data)
+
+
+def close():
+    if _recorder is not None:
+        _recorder.close()
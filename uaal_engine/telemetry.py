@@ -0,0 +1,145 @@
+# uaal_engine/telemetry.py
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_METRICS_FILE = 'uaal_metrics.jsonl'
+WINDOW_SIZE = 500
+FLUSH_EVERY = 50
+
+
+class _NullSpan:
+    """Shared no-op span handed out while telemetry is disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "attrs", "start")
+
+    def __init__(self, recorder, name, attrs):
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.recorder.record(self.name, time.perf_counter() - self.start, self.attrs)
+        return False
+
+
+class MetricsRecorder:
+    """Appends spans to a JSONL file and keeps a rolling window of durations per span name."""
+    def __init__(self, path=DEFAULT_METRICS_FILE, window_size=WINDOW_SIZE):
+        self.path = path
+        self.window_size = window_size
+        self.windows = {}
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, attrs=None):
+        entry = {"ts": round(time.time(), 3), "span": name, "ms": round(seconds * 1000, 3)}
+        if attrs:
+            entry.update(attrs)
+        with self.lock:
+            window = self.windows.get(name)
+            if window is None:
+                window = self.windows[name] = deque(maxlen=self.window_size)
+            window.append(seconds)
+            self.pending.append(entry)
+            if len(self.pending) >= FLUSH_EVERY:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in self.pending))
+        except OSError as e:
+            logging.error(f"Failed to write metrics file '{self.path}': {e}")
+        self.pending = []
+
+    def summary(self):
+        """Returns {span: {count, p50, p90, p99, max}} in milliseconds over the rolling window."""
+        with self.lock:
+            windows = {name: sorted(values) for name, values in self.windows.items()}
+        result = {}
+        for name, values in windows.items():
+            def percentile(p):
+                return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] * 1000
+            result[name] = {
+                "count": len(values), "p50": percentile(50), "p90": percentile(90),
+                "p99": percentile(99), "max": values[-1] * 1000,
+            }
+        return result
+
+
+_recorder = None
+
+
+def enable(path=DEFAULT_METRICS_FILE):
+    global _recorder
+    if _recorder is None:
+        _recorder = MetricsRecorder(path)
+        atexit.register(_recorder.flush)
+        logging.info(f"Timing telemetry enabled. Writing spans to '{path}'.")
+    return _recorder
+
+
+def enable_from_env():
+    """Enables telemetry when UAAL_METRICS is set ('1' for the default file, otherwise a path)."""
+    value = os.environ.get("UAAL_METRICS")
+    if value:
+        enable(DEFAULT_METRICS_FILE if value == "1" else value)
+
+
+def is_enabled():
+    return _recorder is not None
+
+
+def span(name, **attrs):
+    """Times a block: `with telemetry.span("get_ui_dom"): ...`. A no-op when disabled."""
+    if _recorder is None:
+        return NULL_SPAN
+    return _Span(_recorder, name, attrs)
+
+
+def record(name, seconds, **attrs):
+    """Records a duration measured elsewhere, e.g. time accumulated across a loop."""
+    if _recorder is not None:
+        _recorder.record(name, seconds, attrs)
+
+
+def format_summary():
+    """Returns the rolling percentile summary as printable lines."""
+    if _recorder is None:
+        return ["Telemetry is disabled. Set UAAL_METRICS=1 (or a file path) to enable it."]
+    summary = _recorder.summary()
+    if not summary:
+        return ["No spans recorded yet."]
+    lines = [f"{'span':<22}{'count':>7}{'p50 ms':>11}{'p90 ms':>11}{'p99 ms':>11}{'max ms':>11}"]
+    for name in sorted(summary):
+        s = summary[name]
+        lines.append(f"{name:<22}{s['count']:>7}{s['p50']:>11.1f}{s['p90']:>11.1f}{s['p99']:>11.1f}{s['max']:>11.1f}")
+    return lines